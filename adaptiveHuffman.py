@@ -0,0 +1,278 @@
+from huffElement import HuffElement
+from huffTree import HuffNode
+from bitStream import BitWriter
+
+
+class AdaptiveHuffNode(HuffNode):
+    """
+    A HuffNode of an AdaptiveHuffTree. Besides the HuffElement
+    and the two subtrees, an adaptive node knows:
+       - parent: the node above it, None for the root
+       - index: its position in the node numbering of the tree
+    """
+    def __init__(self, element, parent=None):
+        """
+        Create the node for the passed in HuffElement
+        """
+        super().__init__(element)
+        self.parent = parent
+        self.index = 0
+
+
+class AdaptiveHuffTree:
+    """
+    Huffman tree for single pass (adaptive) Huffman coding with
+    the FGK algorithm. The tree starts as a single NYT (not yet
+    transmitted) leaf and is updated after every symbol, so the
+    encoder and the decoder build the same tree from the symbols
+    seen so far, without counting the input first.
+    The nodes are kept in a list ordered by the sibling property:
+    the root is at index 0 and the frequencies never increase
+    along the list, so the nodes with the same frequency (a block)
+    are next to each other. The index of the first node of each
+    block, its leader, is kept in a dictionary by frequency, so
+    finding a leader does not search the list and an update
+    takes time in proportion to the depth of the leaf.
+    """
+    SYMBOL_BITS = 21
+    END = (1 << SYMBOL_BITS) - 1
+
+    def __init__(self):
+        """
+        Create the tree holding only the NYT leaf
+        """
+        self.nyt = AdaptiveHuffNode(HuffElement(None))
+        self.root = self.nyt
+        self._nodes = [self.root]
+        self._leaves = {}
+        self._leaders = {}
+
+    def get_leaf(self, char):
+        """
+        Returns the leaf node for char, or None if
+        char has not been seen yet
+        """
+        return self._leaves.get(char)
+
+    def get_code(self, node):
+        """
+        Returns the code of node as a tuple of its value and its
+        length, walking the parent links from node up to the root
+        """
+        value = 0
+        length = 0
+        while node.parent is not None:
+            if node.parent.right is node:
+                value |= 1 << length
+            length += 1
+            node = node.parent
+        return value, length
+
+    def _add_leaf(self, char):
+        """
+        Split the NYT leaf into an internal node with a new NYT
+        as its left child and the leaf for char as its right child
+        """
+        old_nyt = self.nyt
+        leaf = AdaptiveHuffNode(HuffElement(char), old_nyt)
+        self.nyt = AdaptiveHuffNode(HuffElement(None), old_nyt)
+        old_nyt.right = leaf
+        old_nyt.left = self.nyt
+
+        leaf.index = len(self._nodes)
+        self.nyt.index = len(self._nodes) + 1
+        self._nodes.append(leaf)
+        self._nodes.append(self.nyt)
+        self._leaves[char] = leaf
+        return leaf
+
+    def _block_leader(self, node):
+        """
+        Returns the first node in the list with the same
+        frequency as node. The nodes with frequency 0 are the NYT
+        leaf and, while a new leaf is counted, the new leaf and its
+        parent, which are found by looking back along the list.
+        """
+        freq = node.get_freq()
+        if freq > 0:
+            return self._nodes[self._leaders[freq]]
+        index = node.index
+        while index > 0 and self._nodes[index - 1].get_freq() == 0:
+            index -= 1
+        return self._nodes[index]
+
+    def _increment(self, node):
+        """
+        Increment the frequency of node, which after the swap in
+        update leads its block, unless its parent does, moving
+        the leaders of the blocks of frequency 1 and more:
+          - the block node leaves starts after node, if the next
+            node has the same frequency, or else is gone
+          - node leads the block it joins, unless that block
+            starts before it
+        """
+        freq = node.get_freq()
+        index = node.index
+        if freq > 0 and self._leaders[freq] == index:
+            next_index = index + 1
+            if next_index < len(self._nodes) and self._nodes[next_index].get_freq() == freq:
+                self._leaders[freq] = next_index
+            else:
+                del self._leaders[freq]
+        node.set_freq(freq + 1)
+        if self._leaders.get(freq + 1, index + 1) > index:
+            self._leaders[freq + 1] = index
+
+    def _swap(self, node, other):
+        """
+        Swap the places of two nodes, with their subtrees,
+        in the tree and in the node list
+        """
+        node_parent = node.parent
+        other_parent = other.parent
+        if node_parent is other_parent:
+            node_parent.left, node_parent.right = node_parent.right, node_parent.left
+        else:
+            if node_parent.left is node:
+                node_parent.left = other
+            else:
+                node_parent.right = other
+            if other_parent.left is other:
+                other_parent.left = node
+            else:
+                other_parent.right = node
+            node.parent = other_parent
+            other.parent = node_parent
+
+        self._nodes[node.index] = other
+        self._nodes[other.index] = node
+        node.index, other.index = other.index, node.index
+
+    def update(self, char):
+        """
+        Count one more occurrence of char:
+        1. add a leaf for char, if it has not been seen yet
+        2. from the leaf up to the root, swap each node with the
+           leader of its block (unless that is its parent) and
+           increment its frequency, which keeps the sibling property
+           and the block leaders (see _increment)
+        """
+        node = self._leaves.get(char)
+        if node is None:
+            node = self._add_leaf(char)
+        while node is not None:
+            leader = self._block_leader(node)
+            if leader is not node and leader is not node.parent:
+                self._swap(node, leader)
+            self._increment(node)
+            node = node.parent
+
+
+class AdaptiveHuffEncoder:
+    """
+    Single pass Huffman encoder. Each character is written with
+    its code in the AdaptiveHuffTree built from the characters
+    before it; a new character is written as the NYT code
+    followed by its 21 bit code point. The end of the stream is
+    the NYT code followed by the END value, which is not a
+    code point, so no character is reserved as an end marker.
+    """
+    def __init__(self):
+        """
+        Create the encoder with an empty tree
+        """
+        self._tree = AdaptiveHuffTree()
+        self._writer = BitWriter()
+
+    def encode(self, text):
+        """
+        Encode text and return the bytes of the bitstream that are
+        complete. The bits of a trailing partial byte are returned
+        by a later encode or by finish.
+        """
+        tree = self._tree
+        write = self._writer.write
+        for char in text:
+            node = tree.get_leaf(char)
+            if node is None:
+                write(*tree.get_code(tree.nyt))
+                write(ord(char), tree.SYMBOL_BITS)
+            else:
+                write(*tree.get_code(node))
+            tree.update(char)
+        return bytes(self._writer.take_bytes())
+
+    def finish(self):
+        """
+        Write the end of the stream and return the
+        remaining bytes, padded with zero bits
+        """
+        tree = self._tree
+        self._writer.write(*tree.get_code(tree.nyt))
+        self._writer.write(tree.END, tree.SYMBOL_BITS)
+        return bytes(self._writer.get_bytes())
+
+
+class AdaptiveHuffDecoder:
+    """
+    Single pass Huffman decoder for the bitstream written by
+    AdaptiveHuffEncoder. The bytes can be passed to decode in
+    pieces of any size, as they arrive; a code split between two
+    pieces is finished when the next piece arrives.
+    """
+    def __init__(self):
+        """
+        Create the decoder with an empty tree
+        """
+        self._tree = AdaptiveHuffTree()
+        self._node = self._tree.root
+        self._acc = 0
+        self._acc_bits = 0
+        self.finished = False
+
+    def decode(self, data):
+        """
+        Decode the passed in bytes and return the characters
+        completed by them. Returns the empty string once the
+        end of the stream has been decoded.
+        """
+        tree = self._tree
+        symbol_bits = tree.SYMBOL_BITS
+        node = self._node
+        acc = self._acc
+        acc_bits = self._acc_bits
+        out = []
+        for byte in data:
+            if self.finished:
+                break
+            acc = ((acc & ((1 << acc_bits) - 1)) << 8) | byte
+            acc_bits += 8
+            while True:
+                if node is tree.nyt:
+                    if acc_bits < symbol_bits:
+                        break
+                    acc_bits -= symbol_bits
+                    value = (acc >> acc_bits) & tree.END
+                    if value == tree.END:
+                        self.finished = True
+                        break
+                    char = chr(value)
+                elif node.left is None:
+                    char = node.get_char()
+                else:
+                    if acc_bits == 0:
+                        break
+                    acc_bits -= 1
+                    if (acc >> acc_bits) & 1:
+                        node = node.right
+                    else:
+                        node = node.left
+                    continue
+                out.append(char)
+                tree.update(char)
+                node = tree.root
+
+        self._node = node
+        self._acc = acc
+        self._acc_bits = acc_bits
+        return "".join(out)
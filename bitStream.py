@@ -0,0 +1,90 @@
+class BitWriter:
+    """
+    Packs variable length binary codes into a bytearray.
+    Bits are written most significant bit first, the same bit
+    order bitarray uses, so a packed bitstream and a bitarray
+    built from the equivalent '0'/'1' string hold the same bytes.
+    The last byte is padded with zero bits.
+    """
+    def __init__(self):
+        """
+        Create an empty BitWriter:
+         - _bytes holds the completed bytes
+         - _acc holds the bits not yet flushed to _bytes
+         - _acc_bits is the number of bits held in _acc
+        """
+        self._bytes = bytearray()
+        self._acc = 0
+        self._acc_bits = 0
+        self._flushed_bits = 0
+
+    def __len__(self):
+        """
+        Return the number of bits written so far
+        """
+        return self._flushed_bits + len(self._bytes) * 8 + self._acc_bits
+
+    def write(self, value, length):
+        """
+        Append the low length bits of value to the bitstream.
+        Whole bytes are moved out of the accumulator once it
+        holds 64 bits, so the accumulator stays a small int.
+        """
+        self._acc = (self._acc << length) | value
+        self._acc_bits += length
+        if self._acc_bits >= 64:
+            extra = self._acc_bits & 7
+            num_bytes = self._acc_bits >> 3
+            self._bytes += (self._acc >> extra).to_bytes(num_bytes, 'big')
+            self._acc &= (1 << extra) - 1
+            self._acc_bits = extra
+
+    def write_bytes(self, data, num_bits):
+        """
+        Append the first num_bits bits of the packed bitstream
+        in data, such as the bytes of another BitWriter
+        """
+        num_bytes = (num_bits + 7) >> 3
+        value = int.from_bytes(data[:num_bytes], 'big') >> (num_bytes * 8 - num_bits)
+        self.write(value, num_bits)
+
+    def take_bytes(self):
+        """
+        Remove and return the completed bytes written so far.
+        The bits of a trailing partial byte stay in the writer.
+        """
+        extra = self._acc_bits & 7
+        num_bytes = self._acc_bits >> 3
+        if num_bytes:
+            self._bytes += (self._acc >> extra).to_bytes(num_bytes, 'big')
+            self._acc &= (1 << extra) - 1
+            self._acc_bits = extra
+        done = self._bytes
+        self._flushed_bits += len(done) * 8
+        self._bytes = bytearray()
+        return done
+
+    def get_bytes(self):
+        """
+        Return the packed bitstream as a bytearray, with the
+        final partial byte padded out with zero bits
+        """
+        packed = bytearray(self._bytes)
+        if self._acc_bits:
+            pad = -self._acc_bits % 8
+            num_bytes = (self._acc_bits + pad) >> 3
+            packed += (self._acc << pad).to_bytes(num_bytes, 'big')
+        return packed
+
+
+def read_bits(data, bit_pos, length):
+    """
+    Return the length bits of the packed bitstream in data
+    starting at bit_pos, read as an unsigned number
+    """
+    first = bit_pos >> 3
+    last = (bit_pos + length + 7) >> 3
+    if last > len(data):
+        raise ValueError("Not enough bits in the bitstream")
+    value = int.from_bytes(data[first:last], 'big')
+    return (value >> (last * 8 - bit_pos - length)) & ((1 << length) - 1)
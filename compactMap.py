@@ -0,0 +1,105 @@
+from array import array
+
+from hashMap import HashMap
+from map import MapEntry
+
+REMOVED = object()
+
+
+class CompactMap(HashMap):
+    """
+    Compact Hash Table Implementation for Map ADT
+    It works like HashMap, but instead of a MapEntry object for
+    each entry, it keeps the keys and the values in two parallel
+    lists, in the order the keys were added:
+      - _keys: a Python list of the keys, with REMOVED in the
+        place of a removed key until the next resize
+      - _values: a typed array of the values when a typecode is
+        given, such as 'q' for integer counts or 'd' for floats,
+        or else a Python list
+    With a typecode, an entry costs its key, a 64 bit value, a
+    64 bit hash and its hash table slots, and no other object:
+    a good fit for counting millions of keys. Adding a value the
+    array cannot hold raises TypeError or OverflowError.
+    Iterating creates a new MapEntry for each entry, so changing
+    the value of such an entry does not change the map; use add.
+    """
+    def __init__(self, typecode=None, capacity=8, max_load=2 / 3):
+        """
+        Creates an empty map, with values of the array typecode
+        or, with no typecode, values of any type
+        """
+        self._typecode = typecode
+        self._keys = []
+        self._values = self._new_values()
+        super().__init__(capacity, max_load)
+
+    def __iter__(self):
+        """
+        Returns an iterator for traversing the entries in the map,
+        in the order their keys were added
+        """
+        for key, value in zip(self._keys, self._values):
+            if key is not REMOVED:
+                yield MapEntry(key, value)
+
+    def _new_values(self, values=()):
+        """
+        Returns a new store for values: a typed array
+        for a map with a typecode, or else a list
+        """
+        if self._typecode is None:
+            return list(values)
+        return array(self._typecode, values)
+
+    def _key_at(self, position):
+        """
+        Returns the key of the entry at position
+        """
+        return self._keys[position]
+
+    def _value_at(self, position):
+        """
+        Returns the value of the entry at position
+        """
+        return self._values[position]
+
+    def _set_value_at(self, position, value):
+        """
+        Replace the value of the entry at position
+        """
+        self._values[position] = value
+
+    def _append_entry(self, key, value):
+        """
+        Add an entry for key and value after the last entry
+        """
+        self._values.append(value)
+        self._keys.append(key)
+
+    def _pop_entry(self, position):
+        """
+        Remove the entry at position, leaving REMOVED in the
+        place of its key, and return it as a MapEntry
+        """
+        entry = MapEntry(self._keys[position], self._values[position])
+        self._keys[position] = REMOVED
+        if self._typecode is None:
+            self._values[position] = None
+        return entry
+
+    def _live_positions(self):
+        """
+        Returns the list of the positions of the entries
+        that have not been removed
+        """
+        return [position for position in range(len(self._keys))
+                if self._keys[position] is not REMOVED]
+
+    def _keep_entries(self, positions):
+        """
+        Keep only the entries at the passed in positions,
+        moving them to the front in that order
+        """
+        self._keys = [self._keys[position] for position in positions]
+        self._values = self._new_values([self._values[position] for position in positions])
@@ -1,24 +1,47 @@
-from abc import ABC, abstractmethod
+from abc import abstractmethod
+
+from instrument import current_instrument
+
+
 class Comparable():
     """
-    This class uses a class variable to count the number of times 
-    the compare method is called.  It is designed to be inherited  
-    from classes that implement the compare method, who want to 
-    keep a count of the number of compares performed in the program.
-    The subclass should first call this base class compare method, 
-    and then do the comparison between itself and another object 
-    of its same type.     
-    """ 
-    __num_compares = 0 
+    This class is designed to be inherited from classes that
+    implement the compare method, who want the number of compares
+    performed in the program to be counted.
+    The subclass should first call this base class compare method,
+    and then do the comparison between itself and another object
+    of its same type.
+    The compares are counted, as 'compares', by the Instrument of
+    the current instrumented() scope (see instrument), so each
+    thread or job counts its own compares, and nothing is counted
+    outside a scope.
+    It has no instance attributes, and its empty __slots__ let
+    subclasses with __slots__ do without a per instance __dict__.
+    """
+    __slots__ = ()
+
+    @abstractmethod
+    def compare(self, other):
+        instrument = current_instrument()
+        if instrument is not None:
+            instrument.count('compares')
 
-    @abstractmethod     
-    def compare(object):
-        Comparable.__num_compares += 1
-    
     @classmethod
     def get_num_compares(cls):
-        return Comparable.__num_compares
-    
+        """
+        Returns the number of compares counted in the current
+        instrumented() scope, or 0 outside of one
+        """
+        instrument = current_instrument()
+        if instrument is None:
+            return 0
+        return instrument.get_count('compares')
+
     @classmethod
     def clear_compares(cls):
-        Comparable.__num_compares = 0
+        """
+        Reset the compare count of the current instrumented() scope
+        """
+        instrument = current_instrument()
+        if instrument is not None:
+            instrument.counts.pop('compares', None)
@@ -0,0 +1,504 @@
+import hashlib
+import os
+import pickle
+import struct
+import zlib
+from array import array
+from collections import OrderedDict
+
+from map import Map, MapEntry
+
+MAGIC = b'DMAP'
+VERSION = 1
+PAGE_SIZE = 4096
+NO_PAGE = -1
+
+# magic, version, sequence number, directory page, free list page,
+# number of pages, number of entries, initial number of buckets,
+# linear hashing level, split pointer; followed by their crc32
+SUPERBLOCK = struct.Struct('<4sHQqqqQQQQ')
+SUPERBLOCK_SLOTS = (0, 128)
+# next page in the chain, number of bytes used on the page
+PAGE_HEADER = struct.Struct('<qI')
+PAGE_DATA = PAGE_SIZE - PAGE_HEADER.size
+# key length, value length
+RECORD_HEADER = struct.Struct('<II')
+
+
+def encode_key(key):
+    """
+    Returns the bytes stored for key: a type tag followed by the
+    key. Equal keys give equal bytes, so the bytes are what the
+    DiskMap hashes and compares. Only str, bytes, int (bool is
+    stored as int, as True == 1) and tuples of them are allowed.
+    """
+    if isinstance(key, str):
+        return b's' + key.encode('utf-8', 'surrogatepass')
+    if isinstance(key, (bytes, bytearray)):
+        return b'b' + bytes(key)
+    if isinstance(key, int):
+        return b'i' + str(int(key)).encode('ascii')
+    if isinstance(key, tuple):
+        out = bytearray(b't')
+        for item in key:
+            item_bytes = encode_key(item)
+            out += struct.pack('<I', len(item_bytes))
+            out += item_bytes
+        return bytes(out)
+    raise TypeError("DiskMap keys must be str, bytes, int or tuples of them")
+
+
+def decode_key(key_bytes):
+    """
+    Returns the key stored as key_bytes by encode_key
+    """
+    tag = key_bytes[:1]
+    body = key_bytes[1:]
+    if tag == b's':
+        return body.decode('utf-8', 'surrogatepass')
+    if tag == b'b':
+        return body
+    if tag == b'i':
+        return int(body)
+    items = []
+    pos = 0
+    while pos < len(body):
+        (length,) = struct.unpack_from('<I', body, pos)
+        pos += 4
+        items.append(decode_key(body[pos:pos + length]))
+        pos += length
+    return tuple(items)
+
+
+def key_hash(key_bytes):
+    """
+    Returns a 64 bit hash of the stored key bytes. Unlike hash(),
+    it is the same in every process, so it can place keys on disk.
+    """
+    return int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), 'little')
+
+
+class DiskMap(Map):
+    """
+    Disk-backed Implementation for Map ADT
+    It has the methods of Map, with the entries kept in a single
+    file, so the map can be opened again without rebuilding it and
+    can hold more entries than fit in memory.
+    The file is made of PAGE_SIZE pages:
+      - page 0 holds two copies of the superblock, the record of
+        where everything else is, each with a sequence number and
+        a checksum
+      - the entries are spread over buckets by the hash of their
+        key, each bucket a chain of pages holding its records
+      - the directory, a chain of pages listing the first page of
+        each bucket, and the free list of unused pages
+    The buckets grow by linear hashing: whenever the average
+    bucket holds more than max_load entries, the next bucket in
+    turn is split in two, so growing never rewrites the whole map.
+    Changes are made to buckets held in memory until commit()
+    (called by close(), and by add and remove once more than
+    max_dirty buckets have changed) writes them out. Writes are
+    copy on write: changed buckets go to free pages, never over
+    pages the last commit uses, and only when they are on disk is
+    the older superblock copy overwritten to point at them. A crash
+    therefore leaves the file as of the last finished commit.
+    Pages read are kept in an LRU cache of cache_pages pages.
+    Keys must be str, bytes, int or tuples of them; values can be
+    anything pickle can store. Iterating goes bucket by bucket,
+    not in the order the keys were added, and gives copies of the
+    stored values, so change a value with add.
+    """
+    def __init__(self, filename, cache_pages=256, max_load=64, max_dirty=1024,
+                 fsync=True, num_buckets=16):
+        """
+        Opens the map stored in filename, creating the file
+        with num_buckets empty buckets when it does not exist
+        """
+        super().__init__()
+        self._cache_pages = cache_pages
+        self._max_load = max_load
+        self._max_dirty = max_dirty
+        self._fsync = fsync
+        self._page_cache = OrderedDict()
+        self._dirty = {}
+        self._pending_free = []
+        if os.path.exists(filename) and os.path.getsize(filename) > 0:
+            self._file = open(filename, 'r+b')
+            self._load_superblock()
+        else:
+            self._file = open(filename, 'w+b')
+            self._file.write(bytes(PAGE_SIZE))
+            self._seq = 0
+            self._num_pages = 1
+            self._num_entries = 0
+            self._initial_buckets = num_buckets
+            self._level = 0
+            self._split = 0
+            self._directory = array('q', [NO_PAGE]) * num_buckets
+            self._free = []
+            self._meta_pages = []
+            self.commit()
+
+    def __len__(self):
+        """
+        Returns the number of entries in the map
+        """
+        return self._num_entries
+
+    def __contains__(self, key):
+        """
+        Returns True if the map contains the passed in key
+        and False, otherwise
+        """
+        key_bytes = encode_key(key)
+        return key_bytes in self._get_bucket(self._bucket_index(key_bytes))
+
+    def __iter__(self):
+        """
+        Returns an iterator for traversing the entries in the map,
+        bucket by bucket
+        """
+        for index in range(len(self._directory)):
+            bucket = self._get_bucket(index)
+            for key_bytes, value_bytes in list(bucket.items()):
+                yield MapEntry(decode_key(key_bytes), pickle.loads(value_bytes))
+
+    def __enter__(self):
+        """
+        Returns the map, for use in a with statement
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Commits the changes and closes the file
+        """
+        self.close()
+
+    def add(self, key, value):
+        """
+        Adds a new entry to the map if the passed in key
+        does not exist. Otherwise, the value replaces the
+        current value associated with the key.
+        """
+        key_bytes = encode_key(key)
+        value_bytes = pickle.dumps(value, protocol=4)
+        bucket = self._change_bucket(self._bucket_index(key_bytes))
+        added = key_bytes not in bucket
+        bucket[key_bytes] = value_bytes
+        if added:
+            self._num_entries += 1
+            while self._num_entries > self._max_load * len(self._directory):
+                self._split_bucket()
+        if len(self._dirty) > self._max_dirty:
+            self.commit()
+        return added
+
+    def get_value(self, key):
+        """
+        Returns the value associated with the passed in key,
+        if the key is in the map
+        """
+        key_bytes = encode_key(key)
+        value_bytes = self._get_bucket(self._bucket_index(key_bytes)).get(key_bytes)
+        if value_bytes is None:
+            return None
+        return pickle.loads(value_bytes)
+
+    def get_many(self, keys, default=None):
+        """
+        Returns a list of the values associated with each of the
+        passed in keys, with default for the keys not in the map
+        """
+        values = []
+        for key in keys:
+            if key in self:
+                values.append(self.get_value(key))
+            else:
+                values.append(default)
+        return values
+
+    def remove(self, key):
+        """
+        Removes the entry associated with the passed in key.
+        if the key is in the map
+        """
+        key_bytes = encode_key(key)
+        index = self._bucket_index(key_bytes)
+        if key_bytes not in self._get_bucket(index):
+            return None
+        value_bytes = self._change_bucket(index).pop(key_bytes)
+        self._num_entries -= 1
+        if len(self._dirty) > self._max_dirty:
+            self.commit()
+        return MapEntry(key, pickle.loads(value_bytes))
+
+    def commit(self):
+        """
+        Write the changed buckets to disk, then switch the file
+        over to them by writing the older superblock copy:
+          1. write each changed bucket to free pages
+          2. write the directory, and the free list, which lists
+             the pages the last commit used and this one does not;
+             the free list is written on pages taken from itself,
+             so its own pages never add to it
+          3. flush the pages to disk, write the superblock with
+             the next sequence number and flush it to disk
+          4. the replaced pages can now be reused
+        """
+        if not self._dirty and self._seq > 0:
+            return
+        for index, bucket in self._dirty.items():
+            blob = bytearray()
+            for key_bytes, value_bytes in bucket.items():
+                blob += RECORD_HEADER.pack(len(key_bytes), len(value_bytes))
+                blob += key_bytes
+                blob += value_bytes
+            self._directory[index] = self._write_chain(blob, self._allocate_free)[0]
+        self._dirty.clear()
+
+        dir_page, dir_pages = self._write_chain(self._directory.tobytes(), self._allocate_free)
+        # the pages the last commit used only become free after
+        # this one, so the free list cannot be written on them
+        freed_pages = self._pending_free + self._meta_pages
+        num_list_pages = 0
+        while True:
+            num_listed = len(self._free) - min(num_list_pages, len(self._free)) + len(freed_pages)
+            needed = self._chain_pages(num_listed * 8)
+            if needed <= num_list_pages:
+                break
+            num_list_pages = needed
+        free_list_pages = [self._allocate_free() for index in range(num_list_pages)]
+        free_pages = self._free + freed_pages
+        free_page = self._write_chain(array('q', free_pages).tobytes(), None,
+                                      free_list_pages)[0]
+        self._sync()
+
+        self._seq += 1
+        fields = SUPERBLOCK.pack(MAGIC, VERSION, self._seq, dir_page, free_page,
+                                 self._num_pages, self._num_entries,
+                                 self._initial_buckets, self._level, self._split)
+        self._file.seek(SUPERBLOCK_SLOTS[self._seq % 2])
+        self._file.write(fields + struct.pack('<I', zlib.crc32(fields)))
+        self._sync()
+
+        self._free = free_pages
+        self._pending_free = []
+        self._meta_pages = dir_pages + free_list_pages
+
+    def close(self):
+        """
+        Commit the changes and close the file
+        """
+        if not self._file.closed:
+            self.commit()
+            self._file.close()
+
+    def _bucket_index(self, key_bytes):
+        """
+        Returns the bucket of the stored key, by linear hashing:
+        the hash modulo the number of buckets of the current
+        level, or of the next level for buckets already split
+        """
+        hash_value = key_hash(key_bytes)
+        index = hash_value % (self._initial_buckets << self._level)
+        if index < self._split:
+            index = hash_value % (self._initial_buckets << (self._level + 1))
+        return index
+
+    def _split_bucket(self):
+        """
+        Split the bucket at the split pointer, moving the keys
+        that hash to the new bucket at the end of the directory
+        """
+        old_bucket = self._change_bucket(self._split)
+        new_index = len(self._directory)
+        self._directory.append(NO_PAGE)
+        new_bucket = self._change_bucket(new_index)
+        num_buckets = self._initial_buckets << (self._level + 1)
+        for key_bytes in list(old_bucket):
+            if key_hash(key_bytes) % num_buckets == new_index:
+                new_bucket[key_bytes] = old_bucket.pop(key_bytes)
+
+        self._split += 1
+        if self._split == self._initial_buckets << self._level:
+            self._level += 1
+            self._split = 0
+
+    def _get_bucket(self, index):
+        """
+        Returns the dictionary of key bytes to value bytes of
+        the bucket, the changed one if it has been changed
+        """
+        bucket = self._dirty.get(index)
+        if bucket is None:
+            bucket = self._read_bucket(self._directory[index])[0]
+        return bucket
+
+    def _change_bucket(self, index):
+        """
+        Returns the bucket for changing it, keeping it in memory
+        until the next commit; its pages are freed by that commit
+        """
+        bucket = self._dirty.get(index)
+        if bucket is None:
+            bucket, pages = self._read_bucket(self._directory[index])
+            self._pending_free.extend(pages)
+            self._dirty[index] = bucket
+        return bucket
+
+    def _read_bucket(self, first_page):
+        """
+        Returns the bucket stored in the chain starting at
+        first_page, and the list of the pages of the chain
+        """
+        blob, pages = self._read_chain(first_page)
+        blob = bytes(blob)
+        unpack_from = RECORD_HEADER.unpack_from
+        header_size = RECORD_HEADER.size
+        end = len(blob)
+        bucket = {}
+        pos = 0
+        while pos < end:
+            key_len, value_len = unpack_from(blob, pos)
+            pos += header_size
+            key_end = pos + key_len
+            pos = key_end + value_len
+            bucket[blob[key_end - key_len:key_end]] = blob[key_end:pos]
+        return bucket, pages
+
+    def _read_chain(self, first_page):
+        """
+        Returns the bytes stored in the chain of pages starting
+        at first_page, and the list of the pages of the chain
+        """
+        blob = bytearray()
+        pages = []
+        page_num = first_page
+        while page_num != NO_PAGE:
+            page = self._read_page(page_num)
+            next_page, used = PAGE_HEADER.unpack_from(page)
+            blob += page[PAGE_HEADER.size:PAGE_HEADER.size + used]
+            pages.append(page_num)
+            page_num = next_page
+        return blob, pages
+
+    def _write_chain(self, blob, allocate, pages=None):
+        """
+        Write blob to a chain of pages got from allocate, or to the
+        passed in pages, the ones blob does not fill left empty,
+        and return its first page (NO_PAGE for none) and its pages
+        """
+        pieces = [blob[start:start + PAGE_DATA] for start in range(0, len(blob), PAGE_DATA)]
+        if pages is None:
+            pages = [allocate() for piece in pieces]
+        pieces.extend([b''] * (len(pages) - len(pieces)))
+        for position in range(len(pieces)):
+            if position + 1 < len(pages):
+                next_page = pages[position + 1]
+            else:
+                next_page = NO_PAGE
+            page = PAGE_HEADER.pack(next_page, len(pieces[position])) + bytes(pieces[position])
+            self._write_page(pages[position], page.ljust(PAGE_SIZE, b'\0'))
+        if pages:
+            return pages[0], pages
+        return NO_PAGE, pages
+
+    def _chain_pages(self, num_bytes):
+        """
+        Returns the number of pages a chain of num_bytes takes
+        """
+        return -(-num_bytes // PAGE_DATA)
+
+    def _allocate_free(self):
+        """
+        Returns a page for new data: a free page, if any,
+        or else a new page at the end of the file
+        """
+        if self._free:
+            return self._free.pop()
+        return self._allocate_end()
+
+    def _allocate_end(self):
+        """
+        Returns a new page at the end of the file
+        """
+        self._num_pages += 1
+        return self._num_pages - 1
+
+    def _read_page(self, page_num):
+        """
+        Returns the bytes of the page, from the page cache or the file
+        """
+        page = self._page_cache.get(page_num)
+        if page is not None:
+            self._page_cache.move_to_end(page_num)
+            return page
+        self._file.seek(page_num * PAGE_SIZE)
+        page = self._file.read(PAGE_SIZE)
+        self._cache_page(page_num, page)
+        return page
+
+    def _write_page(self, page_num, page):
+        """
+        Write the bytes of the page to the file and the page cache
+        """
+        self._file.seek(page_num * PAGE_SIZE)
+        self._file.write(page)
+        self._cache_page(page_num, page)
+
+    def _cache_page(self, page_num, page):
+        """
+        Keep the page in the cache, dropping the least
+        recently used page when the cache is full
+        """
+        if self._cache_pages <= 0:
+            return
+        self._page_cache[page_num] = page
+        self._page_cache.move_to_end(page_num)
+        if len(self._page_cache) > self._cache_pages:
+            self._page_cache.popitem(last=False)
+
+    def _sync(self):
+        """
+        Flush the writes to the file, and to the disk
+        unless the map was opened with fsync=False
+        """
+        self._file.flush()
+        if self._fsync:
+            os.fsync(self._file.fileno())
+
+    def _load_superblock(self):
+        """
+        Read the newest valid superblock copy, and the
+        directory and free list it points to
+        """
+        newest = None
+        for offset in SUPERBLOCK_SLOTS:
+            self._file.seek(offset)
+            data = self._file.read(SUPERBLOCK.size + 4)
+            if len(data) < SUPERBLOCK.size + 4:
+                continue
+            fields = data[:SUPERBLOCK.size]
+            (crc,) = struct.unpack('<I', data[SUPERBLOCK.size:])
+            if zlib.crc32(fields) != crc:
+                continue
+            values = SUPERBLOCK.unpack(fields)
+            if values[0] != MAGIC or values[1] != VERSION:
+                continue
+            if newest is None or values[2] > newest[2]:
+                newest = values
+
+        if newest is None:
+            raise ValueError("The file is not a DiskMap file")
+        (magic, version, self._seq, dir_page, free_page, self._num_pages,
+         self._num_entries, self._initial_buckets, self._level, self._split) = newest
+
+        dir_blob, dir_pages = self._read_chain(dir_page)
+        free_blob, free_list_pages = self._read_chain(free_page)
+        self._directory = array('q')
+        self._directory.frombytes(bytes(dir_blob))
+        free = array('q')
+        free.frombytes(bytes(free_blob))
+        self._free = free.tolist()
+        self._meta_pages = dir_pages + free_list_pages
@@ -0,0 +1,248 @@
+from array import array
+
+from map import Map, MapEntry
+from instrument import current_instrument
+
+EMPTY = -1
+DUMMY = -2
+
+
+class HashMap(Map):
+    """
+    Hash Table Implementation for Map ADT
+    It has the methods of Map, with O(1) average time lookups.
+    Like a compact Python dict, it is made of two lists:
+      - _map_entries: the MapEntry objects, in the order their
+        keys were added, so iterating over a HashMap gives the
+        same order as a Map. A removed entry leaves a None
+        behind until the next resize.
+      - _indices: the open addressing hash table. Each slot holds
+        the position of an entry in _map_entries, EMPTY, or DUMMY
+        for the slot of a removed entry, which lookups probe past.
+    A lookup starts at the slot given by the low bits of the hash
+    of the key and probes the next slots in a pseudo random order
+    that brings in the higher bits of the hash too.
+    The table doubles in size when the slots in use pass max_load
+    of its size: a lower max_load means shorter probe sequences
+    for more memory. Inside an instrumented() scope, the slots
+    probed are counted as 'map_probes'.
+    The hash table and the hashes of the keys are typed arrays of
+    64 bit integers, which take 8 bytes an item instead of a list
+    reference plus an int object. The entries are only reached
+    through the _key_at, _value_at, _set_value_at, _append_entry,
+    _pop_entry, _live_positions and _keep_entries methods, so a
+    subclass can store them differently (see CompactMap).
+    """
+    def __init__(self, capacity=8, max_load=2 / 3):
+        """
+        Creates an empty map, with a hash table big enough
+        for capacity keys
+        """
+        if not 0 < max_load < 1:
+            raise ValueError("max_load must be between 0 and 1")
+        super().__init__()
+        self._max_load = max_load
+        self._hashes = array('q')
+        self._num_entries = 0
+        self._used_slots = 0
+        self._indices = array('q', [EMPTY]) * self._table_size(capacity)
+
+    def __len__(self):
+        """
+        Returns the number of entries in the map
+        """
+        return self._num_entries
+
+    def __iter__(self):
+        """
+        Returns an iterator for traversing the entries in the map,
+        in the order their keys were added
+        """
+        return (entry for entry in self._map_entries if entry is not None)
+
+    def __getstate__(self):
+        """
+        Returns the state to pickle, after a resize drops the
+        removed entries, so no holes (or a subclass's marker for
+        them, which would not keep its identity) are pickled
+        """
+        if len(self._hashes) > self._num_entries:
+            self._resize()
+        return self.__dict__.copy()
+
+    def __setstate__(self, state):
+        """
+        Restore a pickled map, hashing its keys again, as the
+        hash of a string differs from one process to the next
+        """
+        self.__dict__.update(state)
+        positions = self._live_positions()
+        self._keep_entries(positions)
+        self._hashes = array('q', [hash(self._key_at(position))
+                                   for position in range(len(positions))])
+        self._resize()
+
+    def get_capacity(self):
+        """
+        Returns the number of slots in the hash table
+        """
+        return len(self._indices)
+
+    def add(self, key, value):
+        """
+        Adds a new entry to the map if the passed in key
+        does not exist. Otherwise, the value replaces the
+        current value associated with the key.
+        """
+        key_hash = hash(key)
+        slot, position = self._lookup(key, key_hash)
+        if position is not None:
+            self._set_value_at(position, value)
+            return False
+
+        self._append_entry(key, value)
+        if self._indices[slot] == EMPTY:
+            self._used_slots += 1
+        self._indices[slot] = len(self._hashes)
+        self._hashes.append(key_hash)
+        self._num_entries += 1
+        if self._used_slots > len(self._indices) * self._max_load:
+            self._resize()
+        return True
+
+    def remove(self, key):
+        """
+        Removes the entry associated with the passed in key.
+        if the key is in the map
+        """
+        slot, position = self._lookup(key, hash(key))
+        if position is None:
+            return None
+        entry = self._pop_entry(position)
+        self._indices[slot] = DUMMY
+        self._num_entries -= 1
+        if len(self._hashes) > 2 * self._num_entries + 8:
+            self._resize()
+        return entry
+
+    def _find_position(self, key):
+        """
+        Returns the position of a passed in key, or None,
+        if the key is not in the map
+        """
+        return self._lookup(key, hash(key))[1]
+
+    def _lookup(self, key, key_hash):
+        """
+        Probe the hash table for key. Returns the slot holding key
+        and the position of its entry, or, when key is not in the
+        map, the slot to add it in (the first DUMMY or EMPTY slot
+        probed) and None
+        """
+        indices = self._indices
+        mask = len(indices) - 1
+        perturb = key_hash & 0xffffffffffffffff
+        slot = key_hash & mask
+        free_slot = None
+        probes = 1
+        while True:
+            index = indices[slot]
+            if index == EMPTY:
+                break
+            if index == DUMMY:
+                if free_slot is None:
+                    free_slot = slot
+            elif self._hashes[index] == key_hash:
+                entry_key = self._key_at(index)
+                if entry_key is key or entry_key == key:
+                    free_slot = slot
+                    break
+            perturb >>= 5
+            slot = (slot * 5 + perturb + 1) & mask
+            probes += 1
+
+        instrument = current_instrument()
+        if instrument is not None:
+            instrument.count('map_probes', probes)
+        if index >= 0:
+            return free_slot, index
+        if free_slot is None:
+            free_slot = slot
+        return free_slot, None
+
+    def _table_size(self, num_entries):
+        """
+        Returns the hash table size (a power of 2) that holds
+        num_entries keys filling at most half of max_load of it,
+        so the table can take as many keys again before growing
+        """
+        size = 8
+        while size * self._max_load < 2 * num_entries:
+            size *= 2
+        return size
+
+    def _resize(self):
+        """
+        Rebuild the hash table for the current number of entries,
+        dropping the removed entries and DUMMY slots
+        """
+        positions = self._live_positions()
+        hashes = array('q', [self._hashes[position] for position in positions])
+        self._keep_entries(positions)
+
+        indices = array('q', [EMPTY]) * self._table_size(len(positions))
+        mask = len(indices) - 1
+        for position in range(len(positions)):
+            key_hash = hashes[position]
+            perturb = key_hash & 0xffffffffffffffff
+            slot = key_hash & mask
+            while indices[slot] != EMPTY:
+                perturb >>= 5
+                slot = (slot * 5 + perturb + 1) & mask
+            indices[slot] = position
+
+        self._hashes = hashes
+        self._indices = indices
+        self._used_slots = len(positions)
+
+    def _key_at(self, position):
+        """
+        Returns the key of the entry at position
+        """
+        return self._map_entries[position].key
+
+    def _set_value_at(self, position, value):
+        """
+        Replace the value of the entry at position
+        """
+        self._map_entries[position].value = value
+
+    def _append_entry(self, key, value):
+        """
+        Add an entry for key and value after the last entry
+        """
+        self._map_entries.append(MapEntry(key, value))
+
+    def _pop_entry(self, position):
+        """
+        Remove the entry at position, leaving a hole behind,
+        and return it
+        """
+        entry = self._map_entries[position]
+        self._map_entries[position] = None
+        return entry
+
+    def _live_positions(self):
+        """
+        Returns the list of the positions of the entries
+        that have not been removed
+        """
+        return [position for position in range(len(self._map_entries))
+                if self._map_entries[position] is not None]
+
+    def _keep_entries(self, positions):
+        """
+        Keep only the entries at the passed in positions,
+        moving them to the front in that order
+        """
+        self._map_entries = [self._map_entries[position] for position in positions]
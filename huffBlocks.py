@@ -0,0 +1,140 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from huffman import Huffman, symbol_kind
+from huffHeader import HuffHeader, write_varint, read_varint
+
+
+def compress_block(block):
+    """
+    Compress one block with its own Huffman codes.
+    This runs in the worker processes, so it is a module
+    level function that the process pool can pickle.
+    """
+    return Huffman().compress_to_bytes(block)
+
+
+def decompress_block(data):
+    """
+    Decompress one block written by compress_block
+    """
+    return Huffman().decompress_bytes(data)
+
+
+class HuffBlocks:
+    """
+    Block mode Huffman compression.
+    The input string (or bytes) is split into blocks of block_size
+    characters (or bytes) and each block is compressed
+    independently, with its own HuffHeader and codes, across a
+    pool of worker processes.
+    The blocks are written to a container:
+      - the magic bytes b'HB'
+      - the HuffHeader kind of the input, TEXT or BYTES, so even
+        an empty container decompresses to the right type
+      - the number of blocks
+      - the block index: the compressed size and the number of
+        characters of each block
+      - the compressed blocks, one after the other
+    The block index lets decompression hand each block to a
+    worker process without decoding the blocks before it, and
+    check the length of each decoded block.
+    """
+    MAGIC = b'HB'
+
+    def __init__(self, block_size=1 << 20, max_workers=None):
+        """
+        Create the block compressor:
+         - block_size is the number of characters per block
+         - max_workers is the number of worker processes,
+           defaulting to the number of CPUs
+        """
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1")
+        self._block_size = block_size
+        self._max_workers = max_workers
+
+    def _map(self, function, items):
+        """
+        Apply function to each item across the process pool,
+        keeping the results in order. A single item, or a
+        single worker, is run in this process instead.
+        """
+        if len(items) <= 1 or self._max_workers == 1:
+            return [function(item) for item in items]
+        with ProcessPoolExecutor(self._max_workers) as pool:
+            return list(pool.map(function, items))
+
+    def compress(self, file_str):
+        """
+        Compress the passed in string, or bytes, into a block
+        container and return its bytes
+        """
+        kind = symbol_kind(file_str)
+        if kind not in (HuffHeader.TEXT, HuffHeader.BYTES):
+            raise TypeError("HuffBlocks compresses a string or bytes")
+        blocks = []
+        for start in range(0, len(file_str), self._block_size):
+            blocks.append(file_str[start:start + self._block_size])
+        compressed = self._map(compress_block, blocks)
+
+        out = bytearray(self.MAGIC)
+        write_varint(out, kind)
+        write_varint(out, len(blocks))
+        for block, data in zip(blocks, compressed):
+            write_varint(out, len(data))
+            write_varint(out, len(block))
+        for data in compressed:
+            out += data
+        return bytes(out)
+
+    def read_index(self, data):
+        """
+        Read the block index of a block container.
+        Returns the HuffHeader kind of the container, and a list
+        of (offset, compressed size, number of characters) tuples,
+        one for each block
+        """
+        position = [0]
+
+        def read_byte():
+            if position[0] >= len(data):
+                raise ValueError("Truncated Huffman block index")
+            position[0] += 1
+            return data[position[0] - 1]
+
+        if bytes(data[:2]) != self.MAGIC:
+            raise ValueError("Not a Huffman block container")
+        position[0] = 2
+        kind = read_varint(read_byte)
+        if kind not in (HuffHeader.TEXT, HuffHeader.BYTES):
+            raise ValueError("Unknown Huffman block container kind")
+        num_blocks = read_varint(read_byte)
+        sizes = []
+        for i in range(num_blocks):
+            size = read_varint(read_byte)
+            sizes.append((size, read_varint(read_byte)))
+
+        index = []
+        offset = position[0]
+        for size, num_chars in sizes:
+            index.append((offset, size, num_chars))
+            offset += size
+        return kind, index
+
+    def decompress(self, data):
+        """
+        Decompress a block container, decoding the blocks
+        across the process pool, and return the string, or
+        the bytes if bytes were compressed
+        """
+        kind, index = self.read_index(data)
+        blocks = []
+        for offset, size, num_chars in index:
+            blocks.append(bytes(data[offset:offset + size]))
+        decoded = self._map(decompress_block, blocks)
+        for block, (offset, size, num_chars) in zip(decoded, index):
+            if len(block) != num_chars:
+                raise ValueError("Corrupt Huffman block: wrong length")
+        if kind == HuffHeader.BYTES:
+            return b"".join(decoded)
+        return "".join(decoded)
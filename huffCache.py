@@ -0,0 +1,132 @@
+import math
+import threading
+from collections import OrderedDict
+
+from huffDecoder import HuffTableDecoder
+
+
+class HuffCodeCache:
+    """
+    Least recently used cache of Huffman code lengths and decoders,
+    shared by any number of Huffman objects in the process.
+      - code lengths are found by a fingerprint of the HuffMap
+        histogram, so inputs with the same symbols and nearly the
+        same frequencies reuse the codes built for the first of
+        them instead of building the Huffman tree again
+      - decoders are found by the code lengths in a HuffHeader,
+        so data compressed with the same codes reuses the decoder
+        and its lookup tables
+    The fingerprint rounds each frequency to resolution steps of
+    its ideal code length (log2 of the total over the frequency),
+    so only inputs whose ideal code lengths all round the same
+    share their codes, and the shared codes fit each of them well.
+    Each cache holds at most max_entries items, dropping the least
+    recently used one when it is full.
+    A lock guards the lookups and stores, so threads (such as the
+    workers of a Huffman executor) can share one cache.
+    """
+    def __init__(self, max_entries=64, resolution=2):
+        """
+        Create an empty cache
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self._max_entries = max_entries
+        self._resolution = resolution
+        self._code_lengths = OrderedDict()
+        self._decoders = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'code_hits': 0, 'code_misses': 0,
+                       'decoder_hits': 0, 'decoder_misses': 0,
+                       'evictions': 0}
+
+    def __len__(self):
+        """
+        Returns the number of code lengths and decoders cached
+        """
+        return len(self._code_lengths) + len(self._decoders)
+
+    def fingerprint(self, huff_map, max_code_len=None):
+        """
+        Returns the fingerprint of the histogram in huff_map: the set
+        of (symbol, rounded ideal code length) pairs, together with
+        the maximum code length the codes are built for
+        """
+        elements = huff_map.get_elements()
+        total = sum([huff_element.get_freq() for huff_element in elements])
+        buckets = []
+        for huff_element in elements:
+            bits = math.log2(total / huff_element.get_freq())
+            buckets.append((huff_element.get_char(), round(bits * self._resolution)))
+        return max_code_len, frozenset(buckets)
+
+    def get_code_lengths(self, key):
+        """
+        Returns the list of (symbol, code length) tuples cached for
+        the fingerprint key, or None when there are none
+        """
+        return self._lookup(self._code_lengths, key, 'code')
+
+    def put_code_lengths(self, key, code_lengths):
+        """
+        Cache the list of (symbol, code length) tuples built
+        for the fingerprint key
+        """
+        self._store(self._code_lengths, key, code_lengths)
+
+    def get_decoder(self, code_table):
+        """
+        Returns the HuffTableDecoder for a code table of
+        (symbol, code value, code length) tuples, building it
+        when it is not cached
+        """
+        key = tuple([(symbol, length) for symbol, value, length in code_table])
+        decoder = self._lookup(self._decoders, key, 'decoder')
+        if decoder is None:
+            decoder = HuffTableDecoder(code_table)
+            self._store(self._decoders, key, decoder)
+        return decoder
+
+    def get_stats(self):
+        """
+        Returns a dictionary of the numbers of code length and
+        decoder hits and misses, and of the evictions
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def clear(self):
+        """
+        Remove everything from the cache and reset the stats
+        """
+        with self._lock:
+            self._code_lengths.clear()
+            self._decoders.clear()
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def _lookup(self, entries, key, name):
+        """
+        Returns the entry for key, marking it as the most recently
+        used, or None; counts the hit or miss under name
+        """
+        with self._lock:
+            value = entries.get(key)
+            if value is None:
+                self._stats[name + '_misses'] += 1
+                return None
+            self._stats[name + '_hits'] += 1
+            entries.move_to_end(key)
+            return value
+
+    def _store(self, entries, key, value):
+        """
+        Add the entry for key, dropping the least recently
+        used entry when there are too many
+        """
+        with self._lock:
+            entries[key] = value
+            entries.move_to_end(key)
+            if len(entries) > self._max_entries:
+                entries.popitem(last=False)
+                self._stats['evictions'] += 1
@@ -0,0 +1,323 @@
+_INVALID = ("invalid", None)
+
+
+class HuffTableDecoder:
+    """
+    Table driven Huffman decoder.
+    Instead of walking the Huffman tree one bit at a time, the
+    decoder looks at table_bits bits of the bitstream at once
+    and uses them as an index into a precomputed lookup table.
+    Each table entry holds:
+      - the tuple of symbols completely decoded by those bits
+        (there may be several when the codes are short)
+      - the number of bits used by those symbols
+      - the table to use for the next lookup, or None to stay
+        in the root table. A code longer than the table bits
+        continues in a sub table built for the middle of that code.
+        A stop symbol's entry holds a ("stop", symbol) marker instead.
+    The tables are built from a code table of
+    (symbol, code value, code length) tuples, so they do not
+    depend on the HuffTree the codes came from.
+    """
+    def __init__(self, code_table, table_bits=12, eof=None, stops=()):
+        """
+        Create the decoder:
+         - build the binary trie of the codes
+         - build the root lookup table from the trie
+        Decoding stops at the eof symbol, when it is given,
+        and at any of the stops symbols
+        """
+        self._left = [-1]
+        self._right = [-1]
+        self._is_leaf = [False]
+        self._symbol = [None]
+        self._lengths = {}
+        for symbol, value, length in code_table:
+            self._add_code(symbol, value, length)
+        if self._is_leaf[0]:
+            raise ValueError("Huffman codes must be at least one bit long")
+
+        self._stops = {}
+        for symbol in stops:
+            self._stops[symbol] = ("stop", symbol)
+        if eof is not None:
+            self._stops[eof] = ("stop", eof)
+        self._table_bits = table_bits
+        self._depth = self._subtree_depths()
+        self._sub_tables = {}
+        self._root_table = None
+        self._build_table(0)
+
+    def _add_code(self, symbol, value, length):
+        """
+        Add the path for one code to the trie, creating the
+        internal nodes that are missing along the way
+        """
+        node = 0
+        for shift in range(length - 1, -1, -1):
+            if self._is_leaf[node]:
+                raise ValueError("Huffman codes are not prefix free")
+            children = self._right if (value >> shift) & 1 else self._left
+            if children[node] == -1:
+                children[node] = len(self._is_leaf)
+                self._left.append(-1)
+                self._right.append(-1)
+                self._is_leaf.append(False)
+                self._symbol.append(None)
+            node = children[node]
+
+        if self._is_leaf[node] or self._left[node] != -1 \
+                or self._right[node] != -1:
+            raise ValueError("Huffman codes are not prefix free")
+        self._is_leaf[node] = True
+        self._symbol[node] = symbol
+        self._lengths[symbol] = length
+
+    def _subtree_depths(self):
+        """
+        Return the depth of the deepest leaf below each trie node.
+        Nodes are always created after their parent, so walking
+        the node list backwards visits children before parents.
+        """
+        depth = [0] * len(self._is_leaf)
+        for node in range(len(depth) - 1, -1, -1):
+            for child in (self._left[node], self._right[node]):
+                if child != -1 and depth[child] + 1 > depth[node]:
+                    depth[node] = depth[child] + 1
+        return depth
+
+    def _build_table(self, start):
+        """
+        Build the lookup table for decoding from the trie node
+        start (the root, or the middle of a long code).
+        The table is a tuple (index bits, index mask, entries, start).
+        A sub table never indexes more bits than the deepest code
+        below start, which keeps the sub tables of long codes small.
+        The table is registered before its entries are filled in,
+        so entries can refer back to it or to the root table.
+        """
+        bits = self._table_bits
+        if start != 0:
+            bits = min(bits, self._depth[start])
+        entries = []
+        table = (bits, (1 << bits) - 1, entries, start)
+        if start == 0:
+            self._root_table = table
+        else:
+            self._sub_tables[start] = table
+
+        left = self._left
+        right = self._right
+        is_leaf = self._is_leaf
+        symbol = self._symbol
+        for index in range(1 << bits):
+            node = start
+            symbols = []
+            used = 0
+            next_table = None
+            for bit_pos in range(bits):
+                if (index >> (bits - 1 - bit_pos)) & 1:
+                    node = right[node]
+                else:
+                    node = left[node]
+                if node == -1:
+                    break
+                if is_leaf[node]:
+                    used = bit_pos + 1
+                    if symbol[node] in self._stops:
+                        next_table = self._stops[symbol[node]]
+                        break
+                    symbols.append(symbol[node])
+                    node = 0
+
+            if next_table is not None:
+                pass
+            elif node != -1 and not symbols:
+                # the first code is longer than the table bits
+                used = bits
+                next_table = self._get_sub_table(node)
+            elif not symbols:
+                next_table = _INVALID
+            elif start != 0:
+                next_table = self._root_table
+            entries.append((tuple(symbols), used, next_table))
+
+        return table
+
+    def _get_sub_table(self, node):
+        """
+        Return the lookup table for the trie node, building it
+        the first time it is needed
+        """
+        table = self._sub_tables.get(node)
+        if table is None:
+            table = self._build_table(node)
+        return table
+
+    def get_code_length(self, symbol):
+        """
+        Return the length in bits of the code for symbol
+        """
+        return self._lengths[symbol]
+
+    def decode(self, data, num_bits=None, count=None, start_bit=0):
+        """
+        Decode the packed bitstream in data (bytes, bytearray or
+        memoryview) from bit start_bit, and return the list of
+        decoded symbols.
+        Decoding stops at the first of:
+         - the end of the num_bits valid bits of data
+         - a stop symbol (such as eof), which is not returned
+         - count symbols have been decoded
+        """
+        out = []
+        for symbols in self.decode_chunks([data], num_bits, count, start_bit):
+            if not out:
+                out = symbols
+            else:
+                out.extend(symbols)
+        return out
+
+    def decode_to_stop(self, data, start_bit=0, num_bits=None):
+        """
+        Decode data from bit start_bit up to the next stop symbol.
+        Returns a tuple of:
+         - the list of decoded symbols before the stop symbol
+         - the stop symbol, or None when the bitstream ended first
+         - the bit position following the stop symbol's code
+        """
+        out = []
+        result = []
+        for symbols in self._decode_chunks([data], num_bits, None, start_bit, result):
+            out.extend(symbols)
+        return out, result[0], result[1]
+
+    def decode_chunks(self, chunks, num_bits=None, count=None, start_bit=0):
+        """
+        Generator that decodes a packed bitstream arriving as an
+        iterable of byte chunks, returning the list of symbols
+        decoded from each chunk. A code split across two chunks
+        is carried over in the bit accumulator, so only one chunk
+        is held in memory at a time.
+        Decoding stops under the same conditions as decode.
+        """
+        return self._decode_chunks(chunks, num_bits, count, start_bit, [])
+
+    def _decode_chunks(self, chunks, num_bits, count, start_bit, result):
+        """
+        The decode_chunks generator. When decoding stops, the stop
+        symbol (or None) and the bit position following the last
+        decoded code are appended to the result list.
+        """
+        num_bytes = None
+        if num_bits is not None:
+            num_bytes = (num_bits + 7) >> 3
+        skip = start_bit >> 3
+        drop = start_bit & 7
+        # loaded is the position in the data of the next byte to load
+        loaded = skip
+        decoded = 0
+        acc = 0
+        acc_bits = 0
+        # padding bits after the last valid bit, once they are loaded
+        slack = 0
+        bits, mask, entries, start = self._root_table
+        stop_symbol = None
+        finished = num_bits is not None and start_bit >= num_bits
+        out = []
+
+        for chunk in chunks:
+            if finished:
+                break
+            view = memoryview(chunk)
+            if skip:
+                if len(view) <= skip:
+                    skip -= len(view)
+                    continue
+                view = view[skip:]
+                skip = 0
+            if num_bytes is not None:
+                view = view[:num_bytes - loaded]
+            out = []
+            extend = out.extend
+            byte_pos = 0
+            while byte_pos < len(view):
+                piece = view[byte_pos:byte_pos + 8]
+                byte_pos += len(piece)
+                loaded += len(piece)
+                acc = ((acc & ((1 << acc_bits) - 1)) << (len(piece) * 8)) \
+                    | int.from_bytes(piece, 'big')
+                acc_bits += len(piece) * 8 - drop
+                drop = 0
+                if loaded == num_bytes:
+                    slack = num_bytes * 8 - num_bits
+
+                floor = bits + slack
+                while acc_bits >= floor:
+                    symbols, used, next_table = entries[(acc >> (acc_bits - bits)) & mask]
+                    extend(symbols)
+                    acc_bits -= used
+                    if next_table is not None:
+                        if len(next_table) == 2:
+                            if next_table is _INVALID:
+                                raise ValueError("Invalid Huffman code at bit " +
+                                                 str(loaded * 8 - acc_bits))
+                            stop_symbol = next_table[1]
+                            finished = True
+                            break
+                        bits, mask, entries, start = next_table
+                        floor = bits + slack
+
+                if finished or (count is not None and decoded + len(out) >= count):
+                    finished = True
+                    break
+
+            if not finished and loaded == num_bytes:
+                used, stop_symbol = self._decode_tail(out, acc, acc_bits,
+                                                      acc_bits - slack, start)
+                acc_bits -= used
+                finished = True
+            if count is not None:
+                del out[count - decoded:]
+            decoded += len(out)
+            if finished:
+                break
+            yield out
+            out = []
+
+        if not finished:
+            # the chunks ended before num_bits: all loaded bits are valid
+            used, stop_symbol = self._decode_tail(out, acc, acc_bits, acc_bits, start)
+            acc_bits -= used
+            if count is not None:
+                del out[count - decoded:]
+
+        result.append(stop_symbol)
+        result.append(max(start_bit, loaded * 8 - acc_bits))
+        yield out
+
+    def _decode_tail(self, out, acc, acc_bits, remaining, start):
+        """
+        Decode the last few valid bits one bit at a time, since a
+        table lookup there would also read the padding bits.
+        The symbols are added to out, and a code cut off by the end
+        of the bitstream is dropped.
+        Returns the number of bits used and the stop symbol, or
+        None when no stop symbol was decoded.
+        """
+        node = start
+        used = 0
+        for bit_pos in range(remaining):
+            if (acc >> (acc_bits - 1 - bit_pos)) & 1:
+                node = self._right[node]
+            else:
+                node = self._left[node]
+            if node == -1:
+                raise ValueError("Invalid Huffman code at end of bitstream")
+            if self._is_leaf[node]:
+                used = bit_pos + 1
+                if self._symbol[node] in self._stops:
+                    return used, self._symbol[node]
+                out.append(self._symbol[node])
+                node = 0
+        return used, None
@@ -9,7 +9,10 @@ class HuffElement(Comparable):
     for that character. The key for the HuffMap is the character 
     and the value is a HuffElement object, which contains the
     character, its frequency in the string, and its Huffman code.    
+    There is a HuffElement for each distinct character, so its
+    attributes are kept in __slots__, without a per instance __dict__.
     """
+    __slots__ = ('_ch', '_ch_freq', '_code')
 
     def __init__(self, char):
         """
@@ -61,6 +64,7 @@ class HuffElement(Comparable):
         """
         Use the character frequency count for comparison
         """
+        super().compare(other_huff_elem)
         if self._ch_freq > other_huff_elem.get_freq():
             return 1
         elif self._ch_freq < other_huff_elem.get_freq():
@@ -0,0 +1,301 @@
+def assign_canonical_codes(symbol_lengths):
+    """
+    Assign canonical Huffman codes from a list of
+    (symbol, code length) tuples.
+    The symbols are sorted by code length and then by symbol,
+    and each code is the previous code plus one, shifted left
+    whenever the code length grows. The codes therefore depend
+    only on the code lengths, not on the shape of the HuffTree.
+    Returns a list of (symbol, code value, code length) tuples
+    in canonical order.
+    """
+    code_table = []
+    code = 0
+    prev_length = 0
+    for symbol, length in sorted(symbol_lengths, key=lambda item: (item[1], item[0])):
+        code <<= length - prev_length
+        code_table.append((symbol, code, length))
+        code += 1
+        prev_length = length
+    return code_table
+
+
+def write_varint(out, value):
+    """
+    Append value to the bytearray out as an unsigned LEB128
+    varint: 7 bits per byte, high bit set on all but the last byte
+    """
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(read_byte):
+    """
+    Read an unsigned LEB128 varint, calling read_byte
+    to get each of its bytes
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = read_byte()
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value
+        shift += 7
+
+
+class HuffHeader:
+    """
+    The header written in front of a packed Huffman bitstream,
+    holding everything needed to rebuild the decoder:
+      - the magic bytes b'HF' and a symbol kind byte
+      - the number of valid bits in the bitstream
+      - the number of codes of each length, from 1 to the
+        longest code length
+      - the symbols in canonical order
+    All numbers are stored as varints and the symbols as their
+    code points, so a typical text header is a few dozen bytes.
+    The symbols of a TEXT header are characters; those of a
+    NUMBERED header, and the byte values of a BYTES header, are
+    stored and returned as plain numbers.
+    The symbols of a TOKENS header are strings (such as words) and
+    those of a BYTE_TOKENS header are bytes; each is stored as its
+    length in bytes followed by its UTF-8 encoding or its bytes.
+    A header may also hold a sync point index, flagged by the SYNC
+    bit of the kind byte and stored after the symbols:
+      - the sync interval and the total number of symbols
+      - the bit offset of the code of every sync interval'th
+        symbol, stored as the difference from the previous one
+    The index lets a decoder start in the middle of the bitstream.
+    A STORED header, flagged by the STORED bit of the kind byte,
+    holds no codes: it is followed by the data itself (text as
+    UTF-8), and its number of bits is the size of that data.
+    A STORED header of tokens also holds the number of tokens and
+    the size of each one, so the stored data can be split back
+    into the same tokens.
+    """
+    MAGIC = b'HF'
+    TEXT = 0
+    NUMBERED = 1
+    BYTES = 2
+    TOKENS = 3
+    BYTE_TOKENS = 4
+    SYNC = 0x80
+    STORED = 0x40
+
+    def __init__(self, symbol_lengths, num_bits, kind=TEXT, stored=False):
+        """
+        Create the header from a list of (symbol, code length)
+        tuples and the number of valid bits in the bitstream
+        When stored is True, the data following the header is
+        not Huffman coded, and there are no symbols
+        """
+        self._code_table = assign_canonical_codes(symbol_lengths)
+        self._num_bits = num_bits
+        self._kind = kind
+        self._stored = stored
+        self._sync_interval = 0
+        self._num_symbols = None
+        self._sync_points = []
+        self._token_lengths = []
+
+    def set_sync_points(self, sync_interval, num_symbols, sync_points):
+        """
+        Add a sync point index to the header: sync_points is the
+        list of the bit offsets of the codes of symbols 0,
+        sync_interval, 2 * sync_interval, ... of the num_symbols
+        symbols in the bitstream
+        """
+        self._sync_interval = sync_interval
+        self._num_symbols = num_symbols
+        self._sync_points = sync_points
+
+    def get_sync_interval(self):
+        """
+        Returns the number of symbols between two sync points,
+        or 0 when the header has no sync point index
+        """
+        return self._sync_interval
+
+    def get_num_symbols(self):
+        """
+        Returns the number of symbols in the bitstream,
+        or None when the header has no sync point index
+        """
+        return self._num_symbols
+
+    def get_sync_points(self):
+        """
+        Returns the list of sync point bit offsets
+        """
+        return self._sync_points
+
+    def set_token_lengths(self, token_lengths):
+        """
+        Add the size in bytes of each stored token to a STORED
+        header of tokens
+        """
+        self._token_lengths = token_lengths
+
+    def get_token_lengths(self):
+        """
+        Returns the list of the sizes in bytes of the stored tokens
+        """
+        return self._token_lengths
+
+    def get_code_table(self):
+        """
+        Returns the canonical (symbol, code value, code length)
+        tuples for the symbols in the header
+        """
+        return self._code_table
+
+    def get_num_bits(self):
+        """
+        Returns the number of valid bits in the bitstream
+        """
+        return self._num_bits
+
+    def is_stored(self):
+        """
+        Returns True if the data following the header is stored
+        as it is instead of Huffman coded
+        """
+        return self._stored
+
+    def get_kind(self):
+        """
+        Returns the symbol kind of the bitstream
+        """
+        return self._kind
+
+    def to_bytes(self):
+        """
+        Returns the header packed into bytes
+        """
+        out = bytearray(self.MAGIC)
+        if self._stored:
+            out.append(self._kind | self.STORED)
+            write_varint(out, self._num_bits)
+            if self._kind in (self.TOKENS, self.BYTE_TOKENS):
+                write_varint(out, len(self._token_lengths))
+                for length in self._token_lengths:
+                    write_varint(out, length)
+            return bytes(out)
+        if self._sync_interval:
+            out.append(self._kind | self.SYNC)
+        else:
+            out.append(self._kind)
+        write_varint(out, self._num_bits)
+
+        max_length = 0
+        if self._code_table:
+            max_length = self._code_table[-1][2]
+        length_counts = [0] * (max_length + 1)
+        for symbol, value, length in self._code_table:
+            length_counts[length] += 1
+        write_varint(out, max_length)
+        for length in range(1, max_length + 1):
+            write_varint(out, length_counts[length])
+
+        for symbol, value, length in self._code_table:
+            if self._kind == self.TOKENS:
+                symbol = symbol.encode('utf-8', 'surrogatepass')
+            if self._kind in (self.TOKENS, self.BYTE_TOKENS):
+                write_varint(out, len(symbol))
+                out += symbol
+            elif self._kind == self.TEXT:
+                write_varint(out, ord(symbol))
+            else:
+                write_varint(out, symbol)
+
+        if self._sync_interval:
+            write_varint(out, self._sync_interval)
+            write_varint(out, self._num_symbols)
+            prev_point = 0
+            for point in self._sync_points:
+                write_varint(out, point - prev_point)
+                prev_point = point
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data, pos=0):
+        """
+        Read a header from data starting at pos.
+        Returns the HuffHeader and the position of the
+        bitstream following it
+        """
+        position = [pos]
+
+        def read_byte():
+            if position[0] >= len(data):
+                raise ValueError("Truncated Huffman header")
+            position[0] += 1
+            return data[position[0] - 1]
+
+        return cls._read(read_byte), position[0]
+
+    @classmethod
+    def read_from(cls, in_file):
+        """
+        Read a header from a binary file object, leaving the
+        file positioned at the start of the bitstream
+        """
+        def read_byte():
+            byte = in_file.read(1)
+            if not byte:
+                raise ValueError("Truncated Huffman header")
+            return byte[0]
+
+        return cls._read(read_byte)
+
+    @classmethod
+    def _read(cls, read_byte):
+        """
+        Read the header fields, one byte at a time from read_byte
+        """
+        magic = bytes([read_byte(), read_byte()])
+        if magic != cls.MAGIC:
+            raise ValueError("Not a Huffman compressed file")
+        kind = read_byte()
+        has_sync = kind & cls.SYNC
+        stored = kind & cls.STORED
+        kind &= ~(cls.SYNC | cls.STORED)
+        num_bits = read_varint(read_byte)
+        if stored:
+            header = cls([], num_bits, kind, stored=True)
+            if kind in (cls.TOKENS, cls.BYTE_TOKENS):
+                num_tokens = read_varint(read_byte)
+                header.set_token_lengths([read_varint(read_byte) for i in range(num_tokens)])
+            return header
+
+        max_length = read_varint(read_byte)
+        lengths = []
+        for length in range(1, max_length + 1):
+            lengths.extend([length] * read_varint(read_byte))
+
+        symbol_lengths = []
+        for length in lengths:
+            if kind in (cls.TOKENS, cls.BYTE_TOKENS):
+                symbol = bytes([read_byte() for i in range(read_varint(read_byte))])
+                if kind == cls.TOKENS:
+                    symbol = symbol.decode('utf-8', 'surrogatepass')
+            else:
+                symbol = read_varint(read_byte)
+                if kind == cls.TEXT:
+                    symbol = chr(symbol)
+            symbol_lengths.append((symbol, length))
+        header = cls(symbol_lengths, num_bits, kind)
+
+        if has_sync:
+            sync_interval = read_varint(read_byte)
+            num_symbols = read_varint(read_byte)
+            sync_points = []
+            point = 0
+            for i in range(0, num_symbols, sync_interval):
+                point += read_varint(read_byte)
+                sync_points.append(point)
+            header.set_sync_points(sync_interval, num_symbols, sync_points)
+        return header
@@ -0,0 +1,48 @@
+def package_merge(freqs, max_length):
+    """
+    Compute optimal code lengths for a list of symbol frequencies
+    with no code longer than max_length bits, using the
+    package-merge algorithm:
+     1. start with the list of leaves, one per symbol, sorted
+        by frequency
+     2. max_length - 1 times: pair up neighbouring items into
+        packages, whose weight is the sum of the pair, and merge
+        the packages back into the sorted list of leaves
+     3. select the 2n - 2 lightest items of the final list; the
+        code length of a symbol is the number of times its leaf
+        appears inside the selected items
+    Only the 2n - 2 lightest items of each list can ever be
+    selected, so each list is cut down to that size.
+    Returns the list of code lengths, in the order of freqs.
+    """
+    num_symbols = len(freqs)
+    if num_symbols == 0:
+        return []
+    if num_symbols == 1:
+        return [1]
+    if num_symbols > 1 << max_length:
+        raise ValueError(str(num_symbols) + " symbols do not fit in codes of " +
+                         str(max_length) + " bits")
+
+    # an item is (weight, node) where the node is a symbol index
+    # for a leaf, or a tuple of the two nodes in a package
+    leaves = sorted([(freq, index) for index, freq in enumerate(freqs)],
+                    key=lambda item: item[0])
+    keep = 2 * num_symbols - 2
+    items = leaves
+    for level in range(max_length - 1):
+        packages = []
+        for pos in range(0, len(items) - 1, 2):
+            packages.append((items[pos][0] + items[pos + 1][0],
+                             (items[pos][1], items[pos + 1][1])))
+        items = sorted(leaves + packages, key=lambda item: item[0])[:keep]
+
+    lengths = [0] * num_symbols
+    stack = [node for weight, node in items[:keep]]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, tuple):
+            stack.extend(node)
+        else:
+            lengths[node] += 1
+    return lengths
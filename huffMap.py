@@ -1,11 +1,16 @@
-from map import Map
+from hashMap import HashMap
 from huffElement import HuffElement
 
 
-class HuffMap(Map): 
+class HuffMap(HashMap): 
     """
-    This class inherits from Map with methods tailored
-    to Huffman encoding
+    This class inherits from HashMap with methods tailored
+    to Huffman encoding.
+    Looking up a character probes the hash table instead of
+    searching the whole entry list, which keeps large alphabets
+    (such as the words of a text) fast to count, and the
+    characters keep the order they were added in, which the
+    Huffman tree building relies on to break ties.
     """
     def __init__(self):
         """
@@ -28,6 +33,18 @@ class HuffMap(Map):
         element = HuffElement(char)
         self.add(char, element)
 
+    def add_counts(self, counts):
+        """
+        Add each (character, count) pair of counts to the
+        frequency of the character, adding new characters
+        to the HuffMap in the order they come
+        """
+        for char, count in counts:
+            if not self.contains_char(char):
+                self.add_char(char)
+            huff_element = self.get_huff_elem(char)
+            huff_element.set_freq(huff_element.get_freq() + count)
+
     def get_huff_elem(self, char):
         """
         Returns the HuffElement for a passed in character
@@ -40,3 +57,10 @@ class HuffMap(Map):
         """
         return self.get_key_set()
 
+    def get_elements(self):
+        """
+        Returns the list of HuffElements in the HuffMap, in the
+        order their characters were added
+        """
+        return list(self.values())
+
@@ -0,0 +1,153 @@
+from huffman import Huffman
+from huffHeader import HuffHeader
+from huffLengths import package_merge
+from huffDecoder import HuffTableDecoder
+from bitStream import BitWriter, read_bits
+
+
+class HuffModel:
+    """
+    A static Huffman model, trained once from a sample corpus and
+    then used to compress and decompress any number of messages.
+    The codes never change, so a message is only its bitstream:
+    there is no HuffMap, HuffTree or HuffHeader per message.
+    Besides the characters of the corpus the model has two
+    extra symbols, numbered past the last Unicode code point:
+      - END, written after the last character of a message
+      - ESCAPE, written in front of a character that was not in
+        the corpus, which follows as a 21 bit code point
+    """
+    END = 0x110000
+    ESCAPE = 0x110001
+    ESCAPE_BITS = 21
+
+    def __init__(self, max_code_len=15):
+        """
+        Create an untrained model whose codes will be
+        at most max_code_len bits long
+        """
+        self.max_code_len = max_code_len
+        self._code_lengths = []
+        self._codes = None
+        self._decoder = None
+
+    def train(self, samples):
+        """
+        Train the model from an iterable of sample strings:
+        1. count the characters of all samples in a HuffMap
+        2. give END the number of samples as its count, and
+           ESCAPE a count of one
+        3. get the length limited code lengths with package_merge
+           and build the canonical codes
+        """
+        huff = Huffman()
+        num_samples = 0
+        for sample in samples:
+            huff.build_huff_map(sample)
+            num_samples += 1
+
+        symbols = []
+        freqs = []
+        for char in huff.huff_map.keys():
+            symbols.append(ord(char))
+            freqs.append(huff.huff_map.get_huff_elem(char).get_freq())
+        symbols.extend([self.END, self.ESCAPE])
+        freqs.extend([max(num_samples, 1), 1])
+
+        lengths = package_merge(freqs, self.max_code_len)
+        self._set_code_lengths(list(zip(symbols, lengths)))
+
+    def _set_code_lengths(self, code_lengths):
+        """
+        Build the encoding dictionary and the HuffTableDecoder
+        from a list of (symbol number, code length) tuples
+        """
+        self._code_lengths = code_lengths
+        header = HuffHeader(code_lengths, 0, HuffHeader.NUMBERED)
+        self._codes = {}
+        decode_table = []
+        for symbol, value, length in header.get_code_table():
+            if symbol < self.END:
+                symbol = chr(symbol)
+            self._codes[symbol] = (value, length)
+            decode_table.append((symbol, value, length))
+        self._decoder = HuffTableDecoder(decode_table, stops=(self.END, self.ESCAPE))
+
+    def compress(self, message):
+        """
+        Compress a message string with the model's codes,
+        and return the packed bitstream bytes
+        """
+        if self._codes is None:
+            raise ValueError("The HuffModel has not been trained")
+        codes = self._codes
+        escape_value, escape_length = codes[self.ESCAPE]
+        writer = BitWriter()
+        write = writer.write
+        for char in message:
+            code = codes.get(char)
+            if code is None:
+                write(escape_value, escape_length)
+                write(ord(char), self.ESCAPE_BITS)
+            else:
+                write(code[0], code[1])
+        write(*codes[self.END])
+
+        return bytes(writer.get_bytes())
+
+    def decompress(self, data):
+        """
+        Decompress a message written by compress:
+        decode up to each ESCAPE or the END, reading the code
+        point that follows each ESCAPE directly from the bitstream
+        """
+        if self._decoder is None:
+            raise ValueError("The HuffModel has not been trained")
+        parts = []
+        bit_pos = 0
+        while True:
+            symbols, stop, bit_pos = self._decoder.decode_to_stop(data, bit_pos)
+            parts.append("".join(symbols))
+            if stop != self.ESCAPE:
+                break
+            parts.append(chr(read_bits(data, bit_pos, self.ESCAPE_BITS)))
+            bit_pos += self.ESCAPE_BITS
+
+        return "".join(parts)
+
+    def to_bytes(self):
+        """
+        Returns the model as the bytes of a NUMBERED HuffHeader
+        """
+        return HuffHeader(self._code_lengths, 0, HuffHeader.NUMBERED).to_bytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Create a model from the bytes returned by to_bytes
+        """
+        header, pos = HuffHeader.from_bytes(data)
+        if header.get_kind() != HuffHeader.NUMBERED:
+            raise ValueError("Not a Huffman model")
+        model = cls()
+        code_lengths = []
+        for symbol, value, length in header.get_code_table():
+            code_lengths.append((symbol, length))
+        model._set_code_lengths(code_lengths)
+        return model
+
+    def save(self, filename):
+        """
+        Write the model to a binary file
+        """
+        with open(filename, 'wb') as out_file:
+            out_file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Read a model written by save
+        """
+        with open(filename, 'rb') as in_file:
+            data = in_file.read()
+        return cls.from_bytes(data)
@@ -0,0 +1,319 @@
+"""
+Optional NumPy versions of the Huffman counting, encoding and
+decoding loops. Huffman uses them when NumPy is installed
+(NUMPY_EXISTS) and falls back to its pure Python loops otherwise;
+both paths produce the same HuffMap, byte for byte the same
+bitstream and the same decoded data.
+"""
+
+NUMPY_EXISTS = True
+try:
+    import numpy as np
+except ImportError:
+    NUMPY_EXISTS = False
+
+# number of symbols encoded per step, which bounds the size
+# of the temporary bit arrays
+BLOCK_SIZE = 1 << 16
+
+
+def to_symbol_array(data):
+    """
+    Returns a NumPy array of the symbols of data without copying
+    bytes: the code points of a string, or the byte values of
+    bytes, bytearray or memoryview
+    """
+    if isinstance(data, str):
+        return np.frombuffer(data.encode('utf-32-le', 'surrogatepass'), dtype='<u4')
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+def first_occurrence_order(symbols, num_distinct):
+    """
+    Returns the distinct values of the symbols array in the order
+    they first appear. Only a prefix of the array is searched,
+    growing it until it holds all num_distinct values.
+    """
+    size = 1 << 12
+    while True:
+        values, first_index = np.unique(symbols[:size], return_index=True)
+        if len(values) == num_distinct or size >= len(symbols):
+            return values[np.argsort(first_index)]
+        size *= 4
+
+
+def count_symbols_numpy(huff_map, data):
+    """
+    Add the symbols of data to huff_map, like Huffman.count_symbols:
+    the histogram is one bincount, and the symbols are added to
+    the HuffMap in the order they first appear in data, the same
+    order the pure Python loop adds them in.
+    """
+    symbols = to_symbol_array(data)
+    if len(symbols) == 0:
+        return
+    counts = np.bincount(symbols)
+    order = first_occurrence_order(symbols, np.count_nonzero(counts))
+
+    text = isinstance(data, str)
+    for symbol in order.tolist():
+        count = int(counts[symbol])
+        if text:
+            symbol = chr(symbol)
+        if not huff_map.contains_char(symbol):
+            huff_map.add_char(symbol)
+        huff_element = huff_map.get_huff_elem(symbol)
+        huff_element.set_freq(huff_element.get_freq() + count)
+
+
+def pack_codes_numpy(data, code_table):
+    """
+    Encode data with the (symbol, code value, code length) tuples
+    of code_table, like Huffman.build_packed_bits:
+    1. gather the code value and length of every symbol
+    2. expand the codes into an array of bits, most significant
+       bit first, keeping only the bits inside each code length
+    3. pack the bits 8 per byte with packbits, carrying the bits
+       of a partial byte over to the next block
+    Returns the packed bytes and the number of valid bits, or None
+    when a code is too long for a 64 bit integer.
+    """
+    text = isinstance(data, str)
+    table_symbols = []
+    table_values = []
+    table_lengths = []
+    for symbol, value, length in code_table:
+        table_symbols.append(ord(symbol) if text else symbol)
+        table_values.append(value)
+        table_lengths.append(length)
+    if not table_lengths or max(table_lengths) > 64:
+        return None
+
+    order = np.argsort(table_symbols)
+    sorted_symbols = np.array(table_symbols, dtype=np.int64)[order]
+    values = np.array(table_values, dtype=np.uint64)[order]
+    lengths = np.array(table_lengths, dtype=np.int64)[order]
+    bit_positions = np.arange(lengths.max())
+
+    symbols = to_symbol_array(data)
+    packed = bytearray()
+    carry = np.zeros(0, dtype=np.uint8)
+    num_bits = 0
+    for start in range(0, len(symbols), BLOCK_SIZE):
+        index = np.searchsorted(sorted_symbols, symbols[start:start + BLOCK_SIZE])
+        code_lengths = lengths[index]
+        shifts = code_lengths[:, None] - 1 - bit_positions
+        in_code = shifts >= 0
+        shifts = np.where(in_code, shifts, 0).astype(np.uint64)
+        bits = ((values[index][:, None] >> shifts) & np.uint64(1)).astype(np.uint8)
+        bits = np.concatenate((carry, bits[in_code]))
+
+        whole = len(bits) - len(bits) % 8
+        packed += np.packbits(bits[:whole]).tobytes()
+        carry = bits[whole:]
+        num_bits += int(code_lengths.sum())
+
+    packed += np.packbits(carry).tobytes()
+    return packed, num_bits
+
+
+# the decoder splits the bitstream into blocks of this many bits,
+# which bounds the size of its temporary arrays, and each block
+# into segments of SEGMENT_BITS bits decoded side by side
+DECODE_BLOCK_BITS = 1 << 22
+SEGMENT_BITS = 1 << 10
+# codes longer than this are decoded by HuffTableDecoder instead,
+# as the lookup table has an entry for each value of this many bits
+MAX_TABLE_BITS = 20
+# the number of codes from the start of each segment within which
+# the true codes are looked for
+SYNC_STEPS = 32
+
+
+def decode_codes_numpy(data, num_bits, code_table, symbol_values=None):
+    """
+    Decode the first num_bits bits of the packed bitstream in data
+    with the (symbol, code value, code length) tuples of code_table,
+    like HuffTableDecoder.decode, but decoding many places in the
+    bitstream at once. Huffman decoding is sequential, as each code
+    starts where the one before it ends, but a decoder started at
+    the wrong bit soon falls in step with the codes (prefix codes
+    resynchronize), which makes this work:
+    1. build a lookup table giving the code of each value of the
+       first max code length bits at a position
+    2. split each block of the bitstream into segments, and decode
+       all the segments at the same time, one code per step, each
+       starting at the first bit of its segment, recording the
+       positions of the codes
+    3. walk the segments in order, following the true codes from
+       where the segment before ended, one code at a time, until
+       they reach a position the segment's decoding went through;
+       from there on that decoding is the true one
+    4. gather the codes at the recorded positions on the true path
+    Returns an array holding, for each decoded code, the item of
+    symbol_values (a number below 2 ** 26, such as the code point of
+    a character) for its symbol in code_table, or by default the
+    index of its symbol, or None when a code is longer than
+    MAX_TABLE_BITS bits or the bitstream holds an invalid code.
+    """
+    lengths = np.array([length for symbol, value, length in code_table], dtype=np.int64)
+    if len(lengths) == 0 or lengths.min() < 1 or lengths.max() > MAX_TABLE_BITS:
+        return None
+    max_len = int(lengths.max())
+    min_len = int(lengths.min())
+    code_values = np.array([value for symbol, value, length in code_table], dtype=np.int64)
+    if symbol_values is None:
+        symbol_values = np.arange(len(code_table))
+    symbol_values = np.array(symbol_values, dtype=np.int64)
+
+    # 1. each code fills the table entries of all the values
+    # starting with it, an entry holding its symbol value << 5 |
+    # its length; an entry no code starts (when the codes do not
+    # use up every value, as a single code does not) has a symbol
+    # value above the others and steps one bit
+    starts = code_values << (max_len - lengths)
+    spans = np.int64(1) << (max_len - lengths)
+    codes = np.repeat(np.arange(len(lengths)), spans)
+    code_offsets = np.cumsum(spans) - spans
+    slots = np.repeat(starts, spans) + np.arange(len(codes)) - np.repeat(code_offsets, spans)
+    invalid = int(symbol_values.max()) + 1
+    table = np.full(1 << max_len, invalid << 5 | 1, dtype=np.int32)
+    table[slots] = (symbol_values[codes] << 5) | lengths[codes]
+    complete = len(codes) == len(table)
+
+    # the 32 bits from each byte on, so that the max_len bits at
+    # any position are the word at its byte shifted left past the
+    # bits before it and right past the bits after them; a segment
+    # decodes on past its end until the others reach theirs, so
+    # the bitstream is padded with enough bytes for that
+    max_steps = -(-SEGMENT_BITS // min_len) + 9
+    num_bytes = (num_bits + 7) >> 3
+    raw = np.zeros(num_bytes + max_steps * max_len // 8 + 8, dtype=np.uint32)
+    raw[:num_bytes] = np.frombuffer(data, dtype=np.uint8, count=num_bytes)
+    words = (raw[:-3] << 24) | (raw[1:-2] << 16) | (raw[2:-1] << 8) | raw[3:]
+    table = table.view(np.uint32)
+    top = 32 - max_len
+
+    decoded = []
+    entry = 0
+    for block_start in range(0, num_bits, DECODE_BLOCK_BITS):
+        # positions from here on count from the start of the block,
+        # where block_words starts
+        block_words = words[block_start >> 3:]
+        block_bits = min(DECODE_BLOCK_BITS, num_bits - block_start)
+        seg_starts = np.arange(0, block_bits, SEGMENT_BITS, dtype=np.uint32)
+        seg_ends = np.minimum(seg_starts + SEGMENT_BITS, block_bits).astype(np.uint32)
+        num_segments = len(seg_starts)
+
+        # 2. decode all the segments a code at a time into the rows
+        # of recorded (positions) and recorded_entries (table
+        # entries), until each segment has passed its end
+        recorded = np.empty((max_steps, num_segments), dtype=np.uint32)
+        recorded_entries = np.empty((max_steps, num_segments), dtype=np.uint32)
+        windows = np.empty(num_segments, dtype=np.uint32)
+        shifts = np.empty(num_segments, dtype=np.uint32)
+        recorded[0] = seg_starts
+        step = 0
+        while True:
+            for index in range(8):
+                positions = recorded[step]
+                np.right_shift(positions, 3, out=windows)
+                np.take(block_words, windows, out=windows)
+                np.bitwise_and(positions, 7, out=shifts)
+                np.left_shift(windows, shifts, out=windows)
+                np.right_shift(windows, top, out=windows)
+                np.take(table, windows, out=recorded_entries[step])
+                np.bitwise_and(recorded_entries[step], 31, out=shifts)
+                step += 1
+                np.add(positions, shifts, out=recorded[step])
+            if (recorded[step] >= seg_ends).all():
+                break
+        # the number of codes of each segment before its end, by
+        # a binary search of its (increasing) positions
+        segments = np.arange(num_segments)
+        num_codes = np.zeros(num_segments, dtype=np.int64)
+        upper = np.full(num_segments, step, dtype=np.int64)
+        while (num_codes < upper).any():
+            middle = (num_codes + upper) >> 1
+            before_end = recorded[middle, segments] < seg_ends
+            num_codes = np.where(before_end, middle + 1, num_codes)
+            upper = np.where(before_end, upper, middle)
+        seg_code_ends = recorded[num_codes, segments].tolist()
+        # the codes meet within a few steps, so only the positions
+        # of the first steps are marked, in a row of sync_bits for
+        # each segment (positions past the end of their segment on
+        # the last item, which is never looked at); following the
+        # codes of a segment that do not meet them there to its end
+        # is slower but still right
+        first_steps = recorded[:min(step, SYNC_STEPS)]
+        sync_bits = min(SEGMENT_BITS, SYNC_STEPS * max_len)
+        visited = bytearray(num_segments * sync_bits + 1)
+        np.frombuffer(visited, dtype=np.uint8)[np.where(
+            first_steps < seg_ends, first_steps - seg_starts + segments * sync_bits, len(visited) - 1)] = 1
+
+        # 3. follow the true codes into each segment until they
+        # meet its decoding
+        joins = []
+        prefix_codes = []
+        prefix_counts = []
+        word_at = memoryview(block_words)
+        entry_at = memoryview(table)
+        pos = entry - block_start
+        for segment, seg_end, seg_code_end in zip(range(num_segments), seg_ends.tolist(), seg_code_ends):
+            count = 0
+            seg_start = segment * SEGMENT_BITS
+            sync_end = seg_start + sync_bits
+            row = segment * sync_bits - seg_start
+            while pos < seg_end and not (pos < sync_end and visited[row + pos]):
+                code_entry = entry_at[((word_at[pos >> 3] << (pos & 7)) & 0xffffffff) >> top]
+                prefix_codes.append(code_entry)
+                count += 1
+                pos += code_entry & 31
+            prefix_counts.append(count)
+            if pos < seg_end:
+                joins.append(pos)
+                pos = seg_code_end
+            else:
+                joins.append(seg_end)
+        entry = block_start + pos
+
+        # 4. the codes on the true path: each segment's codes from
+        # where the true codes met them, after the ones found while
+        # following them in, which go in pad columns before them
+        joins = np.array(joins, dtype=np.int32)
+        firsts = np.where(joins < seg_ends, (first_steps < joins).sum(axis=0), num_codes)
+        pad = max(prefix_counts)
+        width = pad + step
+        segment_codes = np.empty((num_segments, width), dtype=np.uint32)
+        np.right_shift(recorded_entries[:step].T, 5, out=segment_codes[:, pad:])
+        prefix_counts = np.array(prefix_counts, dtype=np.int64)
+        path_starts = pad + firsts - prefix_counts
+        prefix_offsets = np.cumsum(prefix_counts) - prefix_counts
+        prefix_slots = np.repeat(segments * width + path_starts - prefix_offsets, prefix_counts)
+        segment_codes.ravel()[prefix_slots + np.arange(len(prefix_codes))] = \
+            np.array(prefix_codes, dtype=np.uint32) >> 5
+        columns = np.arange(width, dtype=np.int32)
+        on_path = (columns >= path_starts[:, None]) & (columns < (pad + num_codes)[:, None])
+        block_codes = segment_codes[on_path]
+        if not complete and (block_codes == invalid).any():
+            return None
+        decoded.append(block_codes)
+
+    if not decoded:
+        return np.zeros(0, dtype=np.uint32)
+    decoded = decoded[0] if len(decoded) == 1 else np.concatenate(decoded)
+    if entry > num_bits:
+        # the last code is cut off by the end of the bitstream
+        decoded = decoded[:-1]
+    return decoded
+
+
+def join_codes_numpy(symbol_values, as_bytes):
+    """
+    Join the symbol values returned by decode_codes_numpy into a
+    string of the characters with those code points, or into bytes
+    when as_bytes
+    """
+    if as_bytes:
+        return symbol_values.astype(np.uint8).tobytes()
+    return symbol_values.astype('<u4', copy=False).tobytes().decode('utf-32-le', 'surrogatepass')
@@ -1,14 +1,29 @@
+from instrument import current_instrument
+
+
 class HuffPQ:
     """
     The Huffman Priority Queue is implemented with a
     minimum heap that uses a Python list to store 
     the HuffTrees in a complete binary tree
+    Inside an instrumented() scope, the swaps of trees made to
+    restore the heap order are counted as 'heap_swaps' (and the
+    compares as 'compares', by the HuffTrees)
     """ 
-    def __init__(self):
+    def __init__(self, trees=None):
         """
-        Create an empty priority queue from a Python list
+        Create a priority queue from a Python list, empty or
+        holding the HuffTrees of the passed in iterable.
+        The trees are put in the list as they are and the heap
+        order is restored bottom up, from the last parent to the
+        root, which takes O(n) compares instead of the
+        O(n log n) of enqueueing them one at a time
         """
         self._pq = []
+        if trees is not None:
+            self._pq = list(trees)
+            for index in range(len(self) // 2 - 1, -1, -1):
+                self._heapify(index)
         
     def __len__(self):
         """
@@ -19,26 +34,59 @@ class HuffPQ:
     def _heapify(self, index):
         """
         Restore the Min Heap order starting 
-        with the tree at the given index
-        """
-        left_index = self._get_left_child(index)
-        right_index = self._get_right_child(index)
-        smallest = index
+        with the tree at the given index, sifting it down
+        Swap the tree with its smaller child until neither
+        child is smaller, in a loop instead of recursively
+        """
+        size = len(self._pq)
+        swaps = 0
+        while True:
+            left_index = self._get_left_child(index)
+            right_index = self._get_right_child(index)
+            smallest = index
 
-        if (left_index < len(self)) and \
-                self._pq[left_index].compare(self._pq[index]) < 0:
-            smallest = left_index
+            if (left_index < size) and \
+                    self._pq[left_index].compare(self._pq[index]) < 0:
+                smallest = left_index
 
-        if (right_index < len(self)) and \
-                self._pq[right_index].compare(self._pq[smallest]) < 0:
-            smallest = right_index
+            if (right_index < size) and \
+                    self._pq[right_index].compare(self._pq[smallest]) < 0:
+                smallest = right_index
 
-        if smallest != index:
+            if smallest == index:
+                break
             temp = self._pq[index]
             self._pq[index] = self._pq[smallest]
             self._pq[smallest] = temp
+            swaps += 1
+
+            index = smallest
+
+        if swaps:
+            instrument = current_instrument()
+            if instrument is not None:
+                instrument.count('heap_swaps', swaps)
+
+    def _sift_up(self, index):
+        """
+        Swap the tree at the given index with its parent
+        until the parent is smaller than that tree
+        """
+        swaps = 0
+        while (index != 0) and \
+                (self._pq[self._get_parent(index)].compare(self._pq[index]) > 0):
 
-            self._heapify(smallest)
+            temp = self._pq[index]
+            self._pq[index] = self._pq[self._get_parent(index)]
+            self._pq[self._get_parent(index)] = temp
+            swaps += 1
+
+            index = self._get_parent(index)
+
+        if swaps:
+            instrument = current_instrument()
+            if instrument is not None:
+                instrument.count('heap_swaps', swaps)
                 
     def _get_parent(self, index):
         """
@@ -65,16 +113,11 @@ class HuffPQ:
         if len(self) == 0:
             return None
 
-        if len(self) == 1:
-            root = self._pq[0]
-            self._pq = []
-            return root
-
         root = self._pq[0]
-        self._pq[0] = self._pq[len(self) - 1]
-        del self._pq[len(self) - 1]
-
-        self._heapify(0)
+        last = self._pq.pop()
+        if len(self) > 0:
+            self._pq[0] = last
+            self._heapify(0)
         return root
 
     def enqueue(self, tree):
@@ -83,23 +126,41 @@ class HuffPQ:
         Then restore the heap order
         """
         self._pq.append(tree)
-        index = len(self) - 1
+        self._sift_up(len(self) - 1)
 
+    def pushpop(self, tree):
         """
-        Swap the element at the given index with its parent
-        until the parent is smaller than that element 
+        Enqueue the tree and then dequeue the minimum tree, with
+        at most one sift down: when the tree is no bigger than the
+        root it is returned right away, otherwise it takes the
+        place of the root, which is returned
         """
-        while (index != 0) and \
-                (self._pq[self._get_parent(index)].compare(self._pq[index]) > 0):
-
-            temp = self._pq[index]
-            self._pq[index] = self._pq[self._get_parent(index)]
-            self._pq[self._get_parent(index)] = temp
+        if len(self) == 0 or tree.compare(self._pq[0]) <= 0:
+            return tree
+        root = self._pq[0]
+        self._pq[0] = tree
+        self._heapify(0)
+        return root
 
-            index = self._get_parent(index)
+    def replace(self, tree):
+        """
+        Dequeue the minimum tree and then enqueue the tree, with
+        one sift down of the tree from the root.
+        Returns the dequeued tree, or None if the queue was empty
+        """
+        if len(self) == 0:
+            self._pq.append(tree)
+            return None
+        root = self._pq[0]
+        self._pq[0] = tree
+        self._heapify(0)
+        return root
 
     def peek(self):
         """
-        Returns the tree with minimum value (root tree)
+        Returns the tree with minimum value (root tree),
+        or None if the queue is empty
         """
+        if len(self) == 0:
+            return None
         return self._pq[0]
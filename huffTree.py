@@ -110,9 +110,10 @@ class HuffTree(Comparable):
         Compare the root node of this HuffTree 
         to that of the other HuffTree
         """
-        if self.root.compare(other_huff_tree.get_root()) < 0:
+        result = self.root.compare(other_huff_tree.get_root())
+        if result < 0:
             return -1
-        if self.root.compare(other_huff_tree.get_root()) > 0:
+        if result > 0:
             return 1
         else:
             return 0
@@ -1,6 +1,172 @@
+import codecs
+import math
+import mmap
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+
 from huffMap import HuffMap
 from huffTree import HuffTree
 from huffPQ import HuffPQ
+from huffDecoder import HuffTableDecoder
+from huffHeader import HuffHeader, assign_canonical_codes
+from huffLengths import package_merge
+from bitStream import BitWriter
+from huffNumpy import NUMPY_EXISTS, count_symbols_numpy, pack_codes_numpy, \
+    decode_codes_numpy, join_codes_numpy
+from instrument import timed
+
+# inputs shorter than this are counted and encoded in pure Python
+# even when NumPy is installed, as the NumPy setup costs more
+NUMPY_MIN_SIZE = 1 << 12
+
+# inputs shorter than this are counted in one piece even when
+# there is an executor, as handing out the chunks costs more
+PARALLEL_MIN_SIZE = 1 << 16
+
+# bitstreams shorter than this are decoded by the HuffTableDecoder
+# even when NumPy is installed
+NUMPY_MIN_DECODE_BITS = 1 << 16
+
+
+_WORD = re.compile(r'\w+|\W+')
+_BYTE_WORD = re.compile(rb'\w+|\W+')
+
+
+def tokenize(data):
+    """
+    Split a string, or bytes, into a list of tokens: the runs of
+    word characters and the runs of the characters between them.
+    Joining the tokens gives back data.
+    """
+    if isinstance(data, str):
+        return _WORD.findall(data)
+    return _BYTE_WORD.findall(bytes(data))
+
+
+def symbol_kind(data):
+    """
+    Returns the HuffHeader kind for the symbols of data: TEXT for
+    a string, BYTES for bytes, and TOKENS or BYTE_TOKENS for a
+    list of string or bytes tokens
+    """
+    if isinstance(data, str):
+        return HuffHeader.TEXT
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return HuffHeader.BYTES
+    if data and not isinstance(data[0], str):
+        return HuffHeader.BYTE_TOKENS
+    return HuffHeader.TOKENS
+
+
+def join_symbols(symbols, kind):
+    """
+    Join a list of decoded symbols into a string for a TEXT or
+    TOKENS HuffHeader kind, or into bytes for a BYTES or
+    BYTE_TOKENS kind
+    """
+    if kind == HuffHeader.BYTES:
+        return bytes(symbols)
+    if kind == HuffHeader.BYTE_TOKENS:
+        return b"".join(symbols)
+    return "".join(symbols)
+
+
+def to_raw_bytes(data, kind):
+    """
+    Returns data as it is written in a STORED HuffHeader's data:
+    text (or string tokens, joined) as UTF-8, and bytes as they are
+    """
+    if kind == HuffHeader.TOKENS:
+        data = "".join(data)
+    elif kind == HuffHeader.BYTE_TOKENS:
+        data = b"".join(data)
+    if isinstance(data, str):
+        return data.encode('utf-8', 'surrogatepass')
+    return bytes(data)
+
+
+def from_raw_bytes(raw, kind):
+    """
+    Returns the string, or bytes, of the data of a STORED HuffHeader
+    """
+    if kind in (HuffHeader.TEXT, HuffHeader.TOKENS):
+        return bytes(raw).decode('utf-8', 'surrogatepass')
+    return bytes(raw)
+
+
+def read_stored(chunks, header):
+    """
+    Generator returning the data of a STORED HuffHeader, arriving
+    as an iterable of byte chunks, one piece at a time: strings for
+    text (a character split between two chunks is finished when
+    the next chunk arrives), or bytes
+    """
+    remaining = header.get_num_bits() // 8
+    text = header.get_kind() in (HuffHeader.TEXT, HuffHeader.TOKENS)
+    decoder = codecs.getincrementaldecoder('utf-8')('surrogatepass')
+    for chunk in chunks:
+        piece = bytes(chunk[:remaining])
+        remaining -= len(piece)
+        if text:
+            yield decoder.decode(piece, remaining == 0)
+        else:
+            yield piece
+        if remaining == 0:
+            break
+
+
+def read_chunks(source, chunk_size):
+    """
+    Generator returning the chunks of a source, which is either
+    a file object, read chunk_size at a time, or an iterable
+    of chunks that is returned as it is
+    """
+    if hasattr(source, 'read'):
+        chunk = source.read(chunk_size)
+        while chunk:
+            yield chunk
+            chunk = source.read(chunk_size)
+    else:
+        yield from source
+
+
+def slice_chunks(data, chunk_size):
+    """
+    Generator returning data (bytes, or an mmap) as memoryview
+    slices of chunk_size bytes, without copying them
+    """
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield view[start:start + chunk_size]
+
+
+def count_chunk(chunk):
+    """
+    Returns a Counter of the symbols in chunk, in the order they
+    first occur. It is a module function so a process pool can
+    run it.
+    """
+    return Counter(chunk)
+
+
+@contextmanager
+def map_file(filename):
+    """
+    Context manager mapping the file into memory, read only, and
+    giving the mmap, which is closed at the end of the with block.
+    The mmap can be used like bytes, with the operating system
+    paging the file in as it is read, so the file is never copied
+    into a Python object. An empty file, which cannot be mapped,
+    gives b''.
+    """
+    with open(filename, 'rb') as in_file:
+        if os.fstat(in_file.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
 
 
 class Huffman:
@@ -8,29 +174,71 @@ class Huffman:
     This Huffman class does the following:
       1. Compresses a passed in string of characters from a text file:
          - build the character frequency map of HuffElements
-         - build the Huffman Tree using the HuffPQ of HuffTrees
-         - recursively walk the Huffman tree assigning the 
+         - build the Huffman Tree from the HuffTrees sorted by frequency
+         - walk the Huffman tree with a stack of nodes, assigning the
            correct binary code to each leaf HuffNode which contain
            the HuffElement for the character  
+         - replace the codes with canonical codes of the same
+           lengths, so the codes can be rebuilt from the lengths
          - build the Huffman encoded binary string by retrieving the
            correct code from the HuffElements for each character
            in the file string
       2. Decompresses the encoded binary string
-         - each binary character (0 or 1) is retrieved from the
-           binary encoded string and used to walk the Huffman tree 
-         - traverse the Huffman tree starting from the root going left 
-           with '0' and right with '1' until you find a leaf node
-         - retrieve the file string character from the HuffElement 
-           in the HuffNode and add it to the output string.
+         - pack the binary string into bytes
+         - decode the packed bits with a HuffTableDecoder, built from
+           the canonical codes, which looks up the next bits of the
+           bitstream in its tables and finds the characters of up
+           to 12 bits of codes at a time, instead of walking the
+           Huffman tree one bit at a time
+         - join the decoded characters into the output string.
+    The table decoder is pure Python, and decodes two to three
+    times faster than walking the tree. With NumPy installed,
+    bitstreams of NUMPY_MIN_DECODE_BITS bits or more are decoded
+    by decode_codes_numpy (see huffNumpy) instead, which is about
+    ten times faster than the tree walk; a decode speedup of 10x
+    or more needs NumPy.
     """
-    def __init__(self):
+    def __init__(self, max_code_len=None, use_numpy=True, min_saving=0.0,
+                 code_cache=None, executor=None, num_chunks=None):
         """
         Constructor: Create the Huffman class object
         Initialize the huff_map instance variable to a HuffMap
         Initialize the huffTree instance variable to None
+        When max_code_len is given, no Huffman code will be
+        longer than max_code_len bits
+        When use_numpy is True and NumPy is installed, large inputs
+        are counted and encoded with NumPy (see huffNumpy); the
+        result is the same as without it
+        compress_to_bytes stores the data as it is, instead of
+        Huffman coding it, unless that saves at least min_saving
+        (a fraction, such as 0.1 for 10%) of the data size
+        code_cache is an optional HuffCodeCache, which can be shared
+        by several Huffman objects, used to reuse the codes built
+        for a similar histogram and the decoders built for the
+        same codes
+        executor is an optional concurrent.futures executor that
+        large inputs are counted on, split into num_chunks chunks
+        (one per CPU by default); see count_symbols_parallel
         """
         self.huff_map = HuffMap()
         self.huff_tree = None
+        self.max_code_len = max_code_len
+        self.use_numpy = use_numpy
+        self.min_saving = min_saving
+        self.code_cache = code_cache
+        self.executor = executor
+        self.num_chunks = num_chunks
+        self.stored = False
+        self._decoder = None
+        self._range_header_bytes = None
+        self._range_header = None
+
+    def _numpy_for(self, data):
+        """
+        Returns True if data should go through the NumPy path
+        """
+        return self.use_numpy and NUMPY_EXISTS and len(data) >= NUMPY_MIN_SIZE \
+            and isinstance(data, (str, bytes, bytearray, memoryview))
 
     def build_huff_map(self, file_str):
         """
@@ -50,40 +258,140 @@ class Huffman:
             huff_element = self.huff_map.get_huff_elem(char)
             huff_element.inc_freq()
 
+    def build_byte_map(self, data):
+        """
+        Populate the huffMap from bytes, the same way build_huff_map
+        does from a string, with the byte values (0 to 255) as keys.
+        The bytes are counted with a Counter, so the HuffMap is
+        only visited once for each distinct byte value.
+        """
+        self.huff_map.add_counts(Counter(data).items())
+
+    def build_token_map(self, tokens):
+        """
+        Populate the huffMap from a list of tokens (strings or
+        bytes, see tokenize), with the tokens as keys. The tokens
+        are counted with a Counter, as in build_byte_map.
+        """
+        self.huff_map.add_counts(Counter(tokens).items())
+
+    @timed('count')
+    def count_symbols(self, data):
+        """
+        Add the symbols of data to the huffMap: the characters of
+        a string, the byte values of bytes, bytearray or memoryview,
+        or the tokens of a list of tokens
+        """
+        if self.executor is not None and len(data) >= PARALLEL_MIN_SIZE:
+            self.count_symbols_parallel(data)
+        elif self._numpy_for(data):
+            count_symbols_numpy(self.huff_map, data)
+        elif isinstance(data, str):
+            self.build_huff_map(data)
+        elif isinstance(data, (bytes, bytearray, memoryview)):
+            self.build_byte_map(data)
+        else:
+            self.build_token_map(data)
+
+    def count_symbols_parallel(self, data):
+        """
+        Add the symbols of data to the huffMap, as count_symbols
+        does, counting chunks of data at the same time:
+        1. split data into num_chunks chunks; memoryview slices
+           are copied to bytes, so they can be sent to another
+           process
+        2. count each chunk with count_chunk on the executor; with
+           a ProcessPoolExecutor the chunks are counted in parallel,
+           while threads only overlap where the GIL is released
+        3. add the counts to the huffMap in chunk order, so the
+           symbols come in the order they first occur in data,
+           as with count_symbols, and the codes are the same
+        """
+        num_chunks = self.num_chunks or os.cpu_count() or 1
+        chunk_size = max(1, math.ceil(len(data) / num_chunks))
+        chunks = []
+        for start in range(0, len(data), chunk_size):
+            chunk = data[start:start + chunk_size]
+            if isinstance(chunk, memoryview):
+                chunk = bytes(chunk)
+            chunks.append(chunk)
+        for counts in self.executor.map(count_chunk, chunks):
+            self.huff_map.add_counts(counts.items())
+
     def build_huff_tree(self):
         """
-        1. Create an empty Huff Priority Queue: HuffPQ
-        2. Create the set of character keys from the HuffMap
-        3. Build a forest of HuffTrees one from each 
-           HuffElement in the HuffMap using the character key 
-           set to retrieve the HuffElements and enqueue each 
-           single node HuffTree to the HuffPQ
-        4. Loop through the HuffPQ min heap, dequeueing the two  
-           lowest frequency count HuffTrees and combine them into 
-           a new HuffTree, enqueueing the new single HuffTree back 
-           to the HuffPQ and repeating until there is only one 
-           HuffTree in the HuffPQ
+        1. Get the list of HuffElements from the HuffMap
+        2. Build a forest of HuffTrees one from each 
+           HuffElement in the HuffMap
+        3. Build the Huff Priority Queue: HuffPQ from the
+           whole forest at once
+        4. Loop through the HuffPQ min heap, dequeueing the lowest
+           frequency count HuffTree and peeking at the next one,
+           and combine them into a new HuffTree that replaces the
+           second one in the HuffPQ, repeating until there is only
+           one HuffTree in the HuffPQ
         5. Dequeue the single HuffTree from the HuffPQ 
            and set it to the HuffTree instance variable
         """
-        huff_pq = HuffPQ()
-        char_key_set = self.huff_map.get_char_set()
-
-        for char in char_key_set:
-            huff_element = self.huff_map.get_huff_elem(char)
-            huff_tree = HuffTree(huff_element)
-            huff_pq.enqueue(huff_tree)
+        forest = []
+        for huff_element in self.huff_map.get_elements():
+            forest.append(HuffTree(huff_element))
+        huff_pq = HuffPQ(forest)
 
         while len(huff_pq) > 1:
             tree1 = huff_pq.dequeue()
-            tree2 = huff_pq.dequeue()
-            huff_pq.enqueue(HuffTree(None, left_tree=tree1, right_tree=tree2))
+            tree2 = huff_pq.peek()
+            huff_pq.replace(HuffTree(None, left_tree=tree1, right_tree=tree2))
 
         self.huff_tree = huff_pq.dequeue()
 
+    def build_sorted_huff_tree(self):
+        """
+        Build the same kind of Huffman Tree as build_huff_tree in
+        linear time after one sort, with the two queue method:
+        1. sort the HuffElements by frequency into the leaf queue,
+           one single node HuffTree for each
+        2. the combined HuffTrees go into a second queue; they are
+           made in order of increasing frequency, so this queue is
+           sorted without any heap
+        3. repeatedly take the two lowest frequency HuffTrees from
+           the fronts of the two queues (the leaf first on a tie)
+           and combine them into a new HuffTree at the back of
+           the second queue, until one HuffTree is left
+        4. set the last HuffTree to the HuffTree instance variable
+        """
+        elements = sorted(self.huff_map.get_elements(),
+                          key=lambda huff_element: huff_element.get_freq())
+        leaves = [HuffTree(huff_element) for huff_element in elements]
+        merged = []
+        next_leaf = 0
+        next_merged = 0
+
+        def take_lowest():
+            nonlocal next_leaf, next_merged
+            if next_merged == len(merged) or (next_leaf < len(leaves) and
+                    leaves[next_leaf].get_root().get_freq() <=
+                    merged[next_merged].get_root().get_freq()):
+                next_leaf += 1
+                return leaves[next_leaf - 1]
+            next_merged += 1
+            return merged[next_merged - 1]
+
+        for i in range(len(leaves) - 1):
+            tree1 = take_lowest()
+            tree2 = take_lowest()
+            merged.append(HuffTree(None, left_tree=tree1, right_tree=tree2))
+
+        if merged:
+            self.huff_tree = merged[-1]
+        elif leaves:
+            self.huff_tree = leaves[0]
+        else:
+            self.huff_tree = None
+
     def build_huff_codes(self, root):
         """
-        This is the helper function for the recursive assign_code
+        This is the helper function for the assign_code
         method that walks the Huffman Tree (self.huff_tree)
         building the code for each character in the file string
         starting from the root of the Huffman Tree.
@@ -95,28 +403,107 @@ class Huffman:
 
     def assign_code(self, root):
         """
-        Recursively get the binary bits for the code as you
-        walk the Huffman Tree to the leaf node.
-        The base case is when the left subtree of the root is None
-        1. Get the code from the root HuffNode and add '0' to it
-           Set this new code in the HuffNode of the left subtree 
-           of root, and then call assign_code passing in the
-           left subtree of root
-        2. Get the code from the root HuffNode and add '1' to it
-           Set this new code in the HuffNode of the right subtree 
-           of root, and then call assign_code passing in the
-           right subtree of root 
-        """
-        if root.left is not None:
-            left_code = root.get_code()
-            left_code += '0'
-            root.left.set_code(left_code)
-            self.assign_code(root.left)
-
-            right_code = root.get_code()
-            right_code += '1'
-            root.right.set_code(right_code)
-            self.assign_code(root.right)
+        Get the binary bits for the code as you walk the
+        Huffman Tree to the leaf nodes.
+        The nodes still to visit are kept on a stack instead of
+        recursing, so a deep tree (from a large alphabet of tokens)
+        cannot hit the recursion limit.
+        For each node taken off the stack, unless it is a leaf
+        (its left subtree is None):
+        1. Get the code from the HuffNode and add '0' to it
+           Set this new code in the HuffNode of the left subtree
+           and push the left subtree onto the stack
+        2. Get the code from the HuffNode and add '1' to it
+           Set this new code in the HuffNode of the right subtree
+           and push the right subtree onto the stack
+        """
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node.left is not None:
+                node.left.set_code(node.get_code() + '0')
+                stack.append(node.left)
+
+                node.right.set_code(node.get_code() + '1')
+                stack.append(node.right)
+
+    def build_limited_codes(self):
+        """
+        Set the code lengths of the characters in the HuffMap with
+        the package-merge algorithm, which gives the optimal code
+        lengths with no code longer than max_code_len bits.
+        Each HuffElement gets a placeholder code of the right
+        length; build_canonical_codes then turns the lengths into
+        the actual codes. No HuffTree is built.
+        """
+        elements = self.huff_map.get_elements()
+        freqs = [huff_element.get_freq() for huff_element in elements]
+
+        lengths = package_merge(freqs, self.max_code_len)
+        for huff_element, length in zip(elements, lengths):
+            huff_element.set_code('0' * length)
+
+    @timed('build_codes')
+    def build_codes(self):
+        """
+        Build the canonical Huffman codes for the characters in
+        the HuffMap:
+        1. without a maximum code length, build the Huffman Tree
+           (see build_sorted_huff_tree) and assign the codes from it
+        2. with a maximum code length, get the code lengths from
+           build_limited_codes
+        3. replace the codes with the canonical codes
+        A single character gets the one bit code '0', since
+        a code must be at least one bit long.
+        With a code_cache, the code lengths cached for the
+        fingerprint of the HuffMap histogram are used when there
+        are any, and the code lengths built are cached otherwise.
+        """
+        if len(self.huff_map) == 0:
+            return
+        key = None
+        if self.code_cache is not None:
+            key = self.code_cache.fingerprint(self.huff_map, self.max_code_len)
+            code_lengths = self.code_cache.get_code_lengths(key)
+            if code_lengths is not None:
+                for char, length in code_lengths:
+                    self.huff_map.get_huff_elem(char).set_code('0' * length)
+                self.build_canonical_codes()
+                return
+
+        if self.max_code_len is None:
+            self.build_sorted_huff_tree()
+            self.build_huff_codes(self.huff_tree.root)
+        else:
+            self.build_limited_codes()
+        if len(self.huff_map) == 1:
+            for huff_element in self.huff_map.get_elements():
+                huff_element.set_code('0')
+        self.build_canonical_codes()
+        if key is not None:
+            self.code_cache.put_code_lengths(key, self.get_code_lengths())
+
+    def build_canonical_codes(self):
+        """
+        Replace the code in each HuffElement with the canonical
+        code of the same length. Canonical codes only depend on
+        the code lengths, which is all the HuffHeader has to store
+        for another Huffman object to decode the bitstream.
+        """
+        for char, value, length in assign_canonical_codes(self.get_code_lengths()):
+            code = format(value, 'b').zfill(length)
+            self.huff_map.get_huff_elem(char).set_code(code)
+
+    def get_code_lengths(self):
+        """
+        Returns a list of (character, code length) tuples,
+        one for each character in the HuffMap
+        """
+        code_lengths = []
+        for huff_element in self.huff_map.get_elements():
+            code = huff_element.get_code()
+            code_lengths.append((huff_element.get_char(), len(code)))
+        return code_lengths
 
     def build_binary_str(self, file_str):
         """
@@ -125,69 +512,592 @@ class Huffman:
         code in the HuffElement which is retrieved from the HuffMap
         Return the binary string
         """
-        binary_string = ""
-        for i in range(len(file_str)):
-            char = file_str[i]
-            huff_element = self.huff_map.get_huff_elem(char)
+        codes = {}
+        for huff_element in self.huff_map.get_elements():
+            codes[huff_element.get_char()] = huff_element.get_code()
+
+        return "".join([codes[char] for char in file_str])
+
+    @timed('encode')
+    def build_packed_bits(self, file_str):
+        """
+        Builds the packed form of the binary string: each character
+        of file_str is replaced by its Huffman code, written as bits
+        into a BitWriter instead of as '0'/'1' characters.
+        Return the packed bytes and the number of valid bits
+        """
+        if self._numpy_for(file_str):
+            packed = pack_codes_numpy(file_str, self.get_code_table())
+            if packed is not None:
+                return packed
+
+        codes = {}
+        for huff_element in self.huff_map.get_elements():
             code = huff_element.get_code()
-            binary_string += code
+            codes[huff_element.get_char()] = (int(code, 2), len(code))
 
-        return binary_string
+        writer = BitWriter()
+        write = writer.write
+        for char in file_str:
+            value, length = codes[char]
+            write(value, length)
+
+        return writer.get_bytes(), len(writer)
+
+    @timed('encode')
+    def _encode_chunk(self, chunk, codes, code_table, writer):
+        """
+        Write the codes for the symbols of one chunk to writer,
+        packing them with NumPy when it is used for the chunk.
+        codes maps each symbol to its (code value, code length)
+        and code_table is the list from get_code_table.
+        """
+        if self._numpy_for(chunk):
+            packed = pack_codes_numpy(chunk, code_table)
+            if packed is not None:
+                writer.write_bytes(*packed)
+                return
+
+        write = writer.write
+        for char in chunk:
+            value, length = codes[char]
+            write(value, length)
 
-    def compress(self, file_str):
+    def compress(self, file_str, packed=False):
         """
         Compresses a passed in string of characters from a text file:
         1. take the passed in file_str and add EOF marker
         1. build the character frequency map of HuffElements
-        2. build the Huffman Tree using the HuffPQ of HuffTrees
-        3. build the Huffman codes, recursively traversing the tree
+        2. build the Huffman Tree from the HuffTrees sorted by frequency
+        3. build the Huffman codes, walking the tree with a stack
+           of nodes, and then make them canonical (see build_codes)
         4. build the Huffman encoded binary string and return it
+
+        When packed is True, the codes are packed 8 bits per byte
+        and a tuple of the packed bytes and the number of valid
+        bits is returned instead of the binary string
         """
         EOF = chr(127)
         file_str += EOF
+        self._decoder = None
         self.build_huff_map(file_str)
-        self.build_huff_tree()
-        self.build_huff_codes(self.huff_tree.root)
+        self.build_codes()
+        if packed:
+            return self.build_packed_bits(file_str)
+
         encoded_b_string = self.build_binary_str(file_str)
 
         return encoded_b_string
 
-    def decompress(self, binary_str):
-        """
-        1. Get the root node of the Huffman tree and set a 
-           current node pointing to the root node
-        2. Loop through each character (0 or 1) in the binary_str:
-           a. Traverse the Huffman tree starting from the root going
-              left with '0' and right with '1' until you find a leaf 
-              node
-           b. When you find a leaf node (both left and right node
-              pointers are None), retrieve the file string character 
-              from the HuffNode 
-           c. Check the character for the EOF char 
-              and break when found
-           d. Reset the current node pointer to root
+    def compress_to_bytes(self, data, sync_interval=None, kind=None):
+        """
+        Compresses a passed in string of characters, bytes, or list
+        of tokens, into a self describing byte string: the HuffHeader
+        holding the code lengths and the number of valid bits,
+        followed by the packed Huffman bitstream.
+        Decoding stops after the number of valid bits, so no EOF
+        character is added, and bytes use all 256 byte values.
+        The result can be decompressed by any Huffman object
+        with decompress_bytes; tokens are joined back together.
+        When sync_interval is given, the header also records a sync
+        point every sync_interval symbols, for decompress_range.
+        Data that Huffman coding would not shrink by min_saving is
+        stored as it is instead (see _build_header).
+        kind is the HuffHeader kind of data, by default worked out
+        by symbol_kind, which cannot tell string tokens from bytes
+        tokens in an empty list.
+        """
+        if kind is None:
+            kind = symbol_kind(data)
+        self.huff_map = HuffMap()
+        self.huff_tree = None
+        self._decoder = None
+        self.count_symbols(data)
+        header = self._build_header(kind, data, sync_interval)
+        if header.is_stored():
+            return header.to_bytes() + to_raw_bytes(data, kind)
+
+        packed_bits, num_bits = self.build_packed_bits(data)
+        return header.to_bytes() + packed_bits
+
+    def _build_header(self, kind, data=None, sync_interval=None):
+        """
+        Build the HuffHeader for the symbols counted in the HuffMap.
+        The bitstream length is worked out from the symbol counts
+        and the code lengths, so the header can be written before
+        the bitstream. When sync_interval is given, the sync points
+        for data are added (see get_sync_points).
+        A STORED header is returned instead (and the stored
+        attribute set to True) when Huffman coding would not save
+        min_saving of the raw size of the data:
+        1. after counting the symbols, the entropy of the HuffMap
+           histogram gives the smallest possible coded size, so
+           hopeless data is stored without building any codes
+        2. after building the codes, the header and the code lengths
+           give the exact coded size, so data is stored before
+           the encoding work is done
+        """
+        raw_size = self.get_raw_size(kind)
+        max_size = raw_size * (1 - self.min_saving)
+        self.stored = self.get_entropy_bits() / 8 >= max_size
+        if not self.stored:
+            self.build_codes()
+            header = HuffHeader(self.get_code_lengths(), self.get_coded_bits(), kind)
+            if sync_interval:
+                header.set_sync_points(sync_interval, len(data),
+                                       self.get_sync_points(data, sync_interval))
+            coded_size = len(header.to_bytes()) + (header.get_num_bits() + 7) // 8
+            self.stored = coded_size >= max_size
+        if self.stored:
+            header = HuffHeader([], raw_size * 8, kind, stored=True)
+            if kind == HuffHeader.TOKENS:
+                header.set_token_lengths([len(token.encode('utf-8', 'surrogatepass')) for token in data])
+            elif kind == HuffHeader.BYTE_TOKENS:
+                header.set_token_lengths([len(token) for token in data])
+        return header
+
+    def get_raw_size(self, kind):
+        """
+        Returns the size in bytes of the symbols counted in the
+        HuffMap when they are stored as they are: one byte per
+        byte, and the UTF-8 size of text
+        """
+        raw_size = 0
+        for huff_element in self.huff_map.get_elements():
+            symbol = huff_element.get_char()
+            if kind in (HuffHeader.TEXT, HuffHeader.TOKENS):
+                symbol_size = len(symbol.encode('utf-8', 'surrogatepass'))
+            elif kind == HuffHeader.BYTE_TOKENS:
+                symbol_size = len(symbol)
+            else:
+                symbol_size = 1
+            raw_size += symbol_size * huff_element.get_freq()
+        return raw_size
+
+    def get_entropy_bits(self):
+        """
+        Returns the entropy of the symbol frequencies in the HuffMap
+        times the number of symbols: the fewest bits any code for
+        one symbol at a time can use, which Huffman codes get
+        within one bit per symbol of
+        """
+        freqs = [huff_element.get_freq() for huff_element in self.huff_map.get_elements()]
+        total = sum(freqs)
+        if total == 0:
+            return 0
+        return total * math.log2(total) - sum([freq * math.log2(freq) for freq in freqs])
+
+    def get_coded_bits(self):
+        """
+        Returns the number of bits the Huffman codes built for the
+        HuffMap use to encode the counted symbols
+        """
+        num_bits = 0
+        for huff_element in self.huff_map.get_elements():
+            num_bits += len(huff_element.get_code()) * huff_element.get_freq()
+        return num_bits
+
+    def get_sync_points(self, data, sync_interval):
+        """
+        Returns the list of the bit offsets, in the bitstream for
+        data, of the codes of symbols 0, sync_interval,
+        2 * sync_interval, ... found by adding up the code lengths
+        of the symbols between them
+        """
+        lengths = dict(self.get_code_lengths())
+        sync_points = []
+        bit_pos = 0
+        for start in range(0, len(data), sync_interval):
+            sync_points.append(bit_pos)
+            bit_pos += sum(map(lengths.__getitem__, data[start:start + sync_interval]))
+        return sync_points
+
+    def compress_words(self, data, sync_interval=None):
+        """
+        Compresses a string, or bytes, with the words (and the runs
+        of characters between them) as the Huffman symbols instead
+        of the single characters; see tokenize. Text with many
+        repeated words compresses much better this way.
+        decompress_bytes returns the original string or bytes.
+        """
+        if isinstance(data, str):
+            kind = HuffHeader.TOKENS
+        else:
+            kind = HuffHeader.BYTE_TOKENS
+        return self.compress_to_bytes(tokenize(data), sync_interval, kind)
+
+    def get_code_table(self):
+        """
+        Returns a list of (character, code value, code length)
+        tuples, one for each character in the HuffMap, with the
+        code value being the Huffman code read as a binary number
+        """
+        code_table = []
+        for huff_element in self.huff_map.get_elements():
+            code = huff_element.get_code()
+            code_table.append((huff_element.get_char(), int(code, 2), len(code)))
+        return code_table
+
+    def _get_table_decoder(self, code_table):
+        """
+        Returns the HuffTableDecoder for a code table read from a
+        HuffHeader, from the code_cache when there is one
+        """
+        if self.code_cache is not None:
+            return self.code_cache.get_decoder(code_table)
+        return HuffTableDecoder(code_table)
+
+    def get_decoder(self):
+        """
+        Returns the HuffTableDecoder for the current Huffman codes,
+        building its lookup tables the first time it is needed
+        """
+        if self._decoder is None:
+            EOF = chr(127)
+            self._decoder = HuffTableDecoder(self.get_code_table(), eof=EOF)
+        return self._decoder
+
+    @timed('decode')
+    def decompress(self, binary_str, num_bits=None):
+        """
+        1. Pack a binary string of '0' and '1' characters into
+           bytes, so both forms are decoded the same way
+        2. Decode the packed bits with the HuffTableDecoder, which
+           resolves up to 12 bits per table lookup instead of
+           walking the Huffman tree one bit at a time, and
+           stops at the EOF char
         3. Return the decompressed string
+
+        binary_str may also be the packed bytes returned by
+        compress(file_str, packed=True); num_bits is then the
+        number of valid bits in it
+        With NumPy, at least NUMPY_MIN_DECODE_BITS bits are decoded
+        by decode_codes_numpy instead, all of them at once, and the
+        string is cut at the EOF char.
         """
-        decoded_str = ""
-        EOF = chr(127)
+        if isinstance(binary_str, str):
+            num_bits = len(binary_str)
+            pad = -num_bits % 8
+            binary_str = (int(binary_str or '0', 2) << pad) \
+                .to_bytes((num_bits + pad) // 8, 'big')
+
+        if self.use_numpy and NUMPY_EXISTS and num_bits >= NUMPY_MIN_DECODE_BITS:
+            code_table = self.get_code_table()
+            decoded = decode_codes_numpy(binary_str, num_bits, code_table,
+                                         [ord(symbol) for symbol, value, length in code_table])
+            if decoded is not None:
+                EOF = chr(127)
+                decoded_str = join_codes_numpy(decoded, False)
+                eof_index = decoded_str.find(EOF)
+                if eof_index >= 0:
+                    decoded_str = decoded_str[:eof_index]
+                return decoded_str
 
-        root_node = self.huff_tree.root
-        current_node = root_node
+        symbols = self.get_decoder().decode(binary_str, num_bits)
+        decoded_str = "".join(symbols)
 
-        for char in binary_str:
-            if char == '0':
-                current_node = current_node.left
-            elif char == '1':
-                current_node = current_node.right
+        return decoded_str
+
+    @timed('decode')
+    def decompress_bytes(self, data):
+        """
+        Decompresses the bytes returned by compress_to_bytes
+        (bytes, bytearray or memoryview):
+        1. read the HuffHeader at the start of data
+        2. rebuild the HuffTableDecoder from the canonical
+           code lengths in the header
+        3. decode the valid bits of the bitstream following
+           the header, without copying it
+        4. return the decompressed string, or bytes when
+           bytes were compressed, joining tokens back together
+        Stored data is returned as it is. With NumPy, a long
+        bitstream is decoded by decode_codes_numpy instead, whose
+        codes are looked up all at once, falling back to the
+        HuffTableDecoder for codes too long for its table.
+        """
+        header, pos = HuffHeader.from_bytes(data)
+        if header.is_stored():
+            return from_raw_bytes(memoryview(data)[pos:pos + header.get_num_bits() // 8],
+                                  header.get_kind())
+        if self.use_numpy and NUMPY_EXISTS and header.get_num_bits() >= NUMPY_MIN_DECODE_BITS:
+            decoded = self._decompress_numpy(memoryview(data)[pos:], header)
+            if decoded is not None:
+                return decoded
+        self._decoder = self._get_table_decoder(header.get_code_table())
+        symbols = self._decoder.decode(memoryview(data)[pos:], header.get_num_bits())
+
+        return join_symbols(symbols, header.get_kind())
+
+    def _decompress_numpy(self, bitstream, header):
+        """
+        Decode bitstream with decode_codes_numpy and join the
+        symbols for the kind of the header, or return None if
+        it cannot decode the bitstream
+        """
+        code_table = header.get_code_table()
+        symbols = [symbol for symbol, value, length in code_table]
+        kind = header.get_kind()
+        if kind == HuffHeader.TEXT:
+            symbol_values = [ord(symbol) for symbol in symbols]
+        elif kind == HuffHeader.BYTES:
+            symbol_values = symbols
+        else:
+            symbol_values = None
+        decoded = decode_codes_numpy(bitstream, header.get_num_bits(), code_table, symbol_values)
+        if decoded is None:
+            return None
+        if symbol_values is not None:
+            return join_codes_numpy(decoded, kind == HuffHeader.BYTES)
+        return join_symbols([symbols[index] for index in decoded.tolist()], kind)
 
-            if current_node.right is None and current_node.left is None:
-                char = current_node.get_char()
-                if char == EOF:
+    @timed('decode')
+    def decompress_range(self, data, start, stop):
+        """
+        Decompresses only the symbols start to stop (not included)
+        of the bytes returned by compress_to_bytes, and returns them
+        as a string (or bytes, or joined tokens).
+        With a sync point index in the header, decoding starts at
+        the last sync point at or before start, so only the bits of
+        at most sync_interval symbols before the range are decoded.
+        Without one, decoding starts at the first symbol.
+        The header and decoder of the last data passed in are kept,
+        and used again for data starting with the same header bytes,
+        so reading several ranges of the same data only reads
+        its header once.
+        Stored bytes are sliced as they are, and stored tokens by
+        the token sizes in the header. Stored text is decoded from
+        UTF-8 a chunk at a time, up to the chunk holding stop, as
+        the byte offset of a character is not known: reading a
+        range of stored text costs O(stop), not O(n).
+        """
+        if start < 0 or stop < start:
+            raise ValueError("Invalid symbol range " + str(start) + ":" + str(stop))
+        header_bytes = self._range_header_bytes
+        if header_bytes is None or memoryview(data)[:len(header_bytes)] != header_bytes:
+            header, pos = HuffHeader.from_bytes(data)
+            decoder = None
+            if not header.is_stored():
+                decoder = self._get_table_decoder(header.get_code_table())
+            self._range_header_bytes = bytes(memoryview(data)[:pos])
+            self._range_header = (header, pos, decoder)
+        header, pos, decoder = self._range_header
+        kind = header.get_kind()
+        if header.is_stored():
+            raw = memoryview(data)[pos:pos + header.get_num_bits() // 8]
+            if kind in (HuffHeader.TOKENS, HuffHeader.BYTE_TOKENS):
+                token_lengths = header.get_token_lengths()
+                start_byte = sum(token_lengths[:start])
+                stop_byte = start_byte + sum(token_lengths[start:stop])
+                return from_raw_bytes(raw[start_byte:stop_byte], kind)
+            if kind != HuffHeader.TEXT:
+                return bytes(raw[start:stop])
+            pieces = []
+            position = 0
+            for piece in read_stored(slice_chunks(raw, 1 << 16), header):
+                if position + len(piece) > start:
+                    pieces.append(piece[max(start - position, 0):stop - position])
+                position += len(piece)
+                if position >= stop:
                     break
+            return "".join(pieces)
 
-                decoded_str += char
-                root_node = self.huff_tree.root
-                current_node = root_node
-        print(decoded_str)
+        first = 0
+        start_bit = 0
+        sync_interval = header.get_sync_interval()
+        if sync_interval and start < header.get_num_symbols():
+            first = start // sync_interval * sync_interval
+            start_bit = header.get_sync_points()[start // sync_interval]
+        symbols = []
+        if stop > start:
+            symbols = decoder.decode(memoryview(data)[pos:], header.get_num_bits(),
+                                     stop - first, start_bit)
 
-        return decoded_str
+        return join_symbols(symbols[start - first:], kind)
+
+    def compress_stream(self, source, out_file, chunk_size=1 << 16):
+        """
+        Compresses a source into the binary out_file, writing
+        the same bytes as compress_to_bytes while holding only one
+        chunk of the source in memory at a time.
+        The source is read twice, once to count the characters and
+        once to encode them, so it must be a file object that can
+        seek back to its start, or an iterable of chunks that can
+        be iterated over again (such as a list). Text sources give
+        a TEXT stream, binary sources a BYTES stream.
+        Returns the number of bytes written.
+        1. build the HuffMap one chunk at a time
+        2. build the canonical codes and write the HuffHeader
+           (see _build_header)
+        3. encode the source again one chunk at a time, writing the
+           completed bytes of the bitstream after each chunk, or
+           copy it as it is when the header is STORED
+        """
+        if hasattr(source, 'read'):
+            start = source.tell()
+        elif iter(source) is source:
+            raise ValueError("compress_stream needs a source it can read twice")
+
+        self.huff_map = HuffMap()
+        self.huff_tree = None
+        self._decoder = None
+        kind = HuffHeader.TEXT
+        if hasattr(source, 'read') and not isinstance(source.read(0), str):
+            kind = HuffHeader.BYTES
+        for chunk in read_chunks(source, chunk_size):
+            if not isinstance(chunk, str):
+                kind = HuffHeader.BYTES
+            self.count_symbols(chunk)
+        header = self._build_header(kind)
+        header_bytes = header.to_bytes()
+        out_file.write(header_bytes)
+        num_bytes = len(header_bytes)
+
+        if hasattr(source, 'read'):
+            source.seek(start)
+        if header.is_stored():
+            for chunk in read_chunks(source, chunk_size):
+                num_bytes += out_file.write(to_raw_bytes(chunk, kind))
+            return num_bytes
+
+        code_table = self.get_code_table()
+        codes = {}
+        for char, value, length in code_table:
+            codes[char] = (value, length)
+        writer = BitWriter()
+        for chunk in read_chunks(source, chunk_size):
+            self._encode_chunk(chunk, codes, code_table, writer)
+            num_bytes += out_file.write(writer.take_bytes())
+        num_bytes += out_file.write(writer.get_bytes())
+
+        return num_bytes
+
+    def compress_file(self, in_filename, out_filename, chunk_size=1 << 20):
+        """
+        Compresses the bytes of the file in_filename into the file
+        out_filename, writing the same bytes as compress_to_bytes.
+        Both files are memory mapped, so neither is copied into
+        a Python object:
+        1. count the bytes of the mapped input one chunk at a time
+        2. build the HuffHeader (see _build_header), which gives
+           the size of the output file
+        3. size the output file and map it
+        4. encode the input again one chunk at a time, copying the
+           completed bytes of the bitstream into the output mapping,
+           or copy the input as it is when the header is STORED
+        Returns the number of bytes written.
+        """
+        with map_file(in_filename) as data:
+            return self._compress_mapped(data, out_filename, chunk_size)
+
+    def _compress_mapped(self, data, out_filename, chunk_size):
+        """
+        Compress the mapped input data of compress_file, and
+        return the number of bytes written; the memoryview slices
+        of data are all released on returning, so it can be closed
+        """
+        self.huff_map = HuffMap()
+        self.huff_tree = None
+        self._decoder = None
+        for chunk in slice_chunks(data, chunk_size):
+            self.count_symbols(chunk)
+        header = self._build_header(HuffHeader.BYTES)
+        header_bytes = header.to_bytes()
+        size = len(header_bytes) + ((header.get_num_bits() + 7) >> 3)
+
+        # a STORED header can come before any codes are built
+        code_table = None
+        codes = {}
+        if not header.is_stored():
+            code_table = self.get_code_table()
+            for byte, value, length in code_table:
+                codes[byte] = (value, length)
+        with open(out_filename, 'w+b') as out_file:
+            out_file.truncate(size)
+            with mmap.mmap(out_file.fileno(), size) as out_map:
+                out_map[:len(header_bytes)] = header_bytes
+                pos = len(header_bytes)
+                writer = BitWriter()
+                for chunk in slice_chunks(data, chunk_size):
+                    if header.is_stored():
+                        done = chunk
+                    else:
+                        self._encode_chunk(chunk, codes, code_table, writer)
+                        done = writer.take_bytes()
+                    out_map[pos:pos + len(done)] = done
+                    pos += len(done)
+                done = writer.get_bytes()
+                out_map[pos:pos + len(done)] = done
+                out_map.flush()
+
+        return size
+
+    def decompress_file(self, in_filename, out_filename, chunk_size=1 << 20):
+        """
+        Decompresses the file in_filename, written by compress_file
+        or saved from compress_to_bytes, into the file out_filename.
+        The input is memory mapped and decoded straight from the
+        mapping one chunk at a time. The output size is not stored
+        in the header, so the decoded chunks are written to the
+        output file as they are produced; decoded text is written
+        as UTF-8.
+        Returns the number of characters (or bytes) decoded.
+        """
+        with map_file(in_filename) as data:
+            return self._decompress_mapped(data, out_filename, chunk_size)
+
+    def _decompress_mapped(self, data, out_filename, chunk_size):
+        """
+        Decompress the mapped input data of decompress_file, and
+        return the number of characters (or bytes) decoded; the
+        memoryview slices of data are all released on returning,
+        so it can be closed
+        """
+        header, pos = HuffHeader.from_bytes(data)
+        chunks = slice_chunks(memoryview(data)[pos:], chunk_size)
+
+        num_chars = 0
+        with open(out_filename, 'wb') as out_file:
+            for decoded in self._decode_pieces(header, chunks):
+                num_chars += len(decoded)
+                if isinstance(decoded, str):
+                    decoded = decoded.encode('utf-8', 'surrogatepass')
+                out_file.write(decoded)
+
+        return num_chars
+
+    def _decode_pieces(self, header, chunks):
+        """
+        Generator decoding the data following header, arriving as
+        an iterable of byte chunks, and returning the decoded text
+        (or bytes) one non empty piece at a time. Stored data is
+        returned as it is (see read_stored).
+        """
+        if header.is_stored():
+            for piece in read_stored(chunks, header):
+                if piece:
+                    yield piece
+            return
+        self._decoder = self._get_table_decoder(header.get_code_table())
+        for symbols in self._decoder.decode_chunks(chunks, header.get_num_bits()):
+            if symbols:
+                yield join_symbols(symbols, header.get_kind())
+
+    def decompress_stream(self, in_file, sink, chunk_size=1 << 16):
+        """
+        Decompresses the binary in_file written by compress_stream
+        or compress_to_bytes, passing the decoded text (or bytes)
+        to sink one chunk at a time. The sink is a file object or
+        any function taking a string (or bytes). Only one chunk of
+        the compressed and the decoded data is held in memory at
+        a time.
+        Returns the number of characters (or bytes) decoded.
+        """
+        write = getattr(sink, 'write', sink)
+        header = HuffHeader.read_from(in_file)
+
+        num_chars = 0
+        for decoded in self._decode_pieces(header, read_chunks(in_file, chunk_size)):
+            write(decoded)
+            num_chars += len(decoded)
+
+        return num_chars
@@ -0,0 +1,145 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+_current = ContextVar('instrument', default=None)
+
+
+class Instrument:
+    """
+    The counters and stage timings recorded inside an
+    instrumented() scope:
+      - counts: the number of each counted event, such as
+        'compares', 'heap_swaps', 'map_probes' and 'set_probes'
+      - timings: the seconds spent in each stage() or timed()
+        function, such as 'count', 'build_codes', 'encode' and
+        'decode'
+      - active: the names of the timed() stages running now
+    """
+    def __init__(self):
+        """
+        Create an Instrument with no counts or timings
+        """
+        self.counts = {}
+        self.timings = {}
+        self.active = set()
+
+    def count(self, name, amount=1):
+        """
+        Add amount to the counter called name
+        """
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def add_time(self, stage_name, seconds):
+        """
+        Add seconds to the time spent in the stage called stage_name
+        """
+        self.timings[stage_name] = self.timings.get(stage_name, 0.0) + seconds
+
+    def get_count(self, name):
+        """
+        Returns the counter called name, 0 if nothing was counted
+        """
+        return self.counts.get(name, 0)
+
+    def get_time(self, stage_name):
+        """
+        Returns the seconds spent in the stage called stage_name
+        """
+        return self.timings.get(stage_name, 0.0)
+
+    def clear(self):
+        """
+        Reset all the counters and timings
+        """
+        self.counts.clear()
+        self.timings.clear()
+        self.active.clear()
+
+    def __str__(self):
+        """
+        Returns a string with one line for each counter and stage
+        """
+        lines = []
+        for name in sorted(self.counts):
+            lines.append(name + ": " + str(self.counts[name]))
+        for stage_name in sorted(self.timings):
+            lines.append(stage_name + ": " + format(self.timings[stage_name], '.6f') + "s")
+        return "\n".join(lines)
+
+
+def current_instrument():
+    """
+    Returns the Instrument of the innermost instrumented() scope
+    of the running thread or task, or None when there is none.
+    Instrumented code calls this once per operation and only
+    counts when it gets an Instrument, so uninstrumented code
+    pays for one context variable lookup.
+    """
+    return _current.get()
+
+
+@contextmanager
+def instrumented(instrument=None):
+    """
+    Context manager recording the counters and stage timings of
+    the code run inside it, in the passed in Instrument or in a
+    new one, which is returned by the with statement:
+
+        with instrumented() as stats:
+            Huffman().compress_to_bytes(text)
+        print(stats.get_count('compares'))
+
+    The scope is held in a context variable, so each thread and
+    each asyncio task records into its own scope. Scopes can be
+    nested; the inner one records instead of the outer one.
+    """
+    if instrument is None:
+        instrument = Instrument()
+    token = _current.set(instrument)
+    try:
+        yield instrument
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(stage_name):
+    """
+    Context manager adding the time spent inside it to the
+    stage called stage_name of the current Instrument, if any
+    """
+    instrument = _current.get()
+    if instrument is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        instrument.add_time(stage_name, time.perf_counter() - start)
+
+
+def timed(stage_name):
+    """
+    Decorator adding the time spent in each call of the decorated
+    function to the stage called stage_name of the current
+    Instrument, if any. Nested calls of functions timed under the
+    same stage name are only timed once, by the outermost call.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            instrument = _current.get()
+            if instrument is None or stage_name in instrument.active:
+                return function(*args, **kwargs)
+            instrument.active.add(stage_name)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                instrument.add_time(stage_name, time.perf_counter() - start)
+                instrument.active.discard(stage_name)
+        return wrapper
+    return decorator
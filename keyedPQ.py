@@ -0,0 +1,207 @@
+class PQHandle:
+    """
+    The handle of an item in a KeyedPQ, returned by push (and by
+    KeyedPQ.from_items for the items loaded in bulk) and used
+    to change the key of that item. index is the position of the
+    item in the heap, or -1 once the item has left the queue.
+    """
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        """
+        Create the handle for the item at index
+        """
+        self.index = index
+
+
+class KeyedPQ:
+    """
+    General purpose d-ary minimum heap of items with numeric keys.
+    Unlike HuffPQ, the items are never compared: the heap is kept
+    in three parallel Python lists,
+      - _prios: a (key, sequence number) tuple for each item,
+        compared in one step
+      - _items: the items themselves
+      - _handles: the PQHandle of each item
+    The sequence number counts the pushes, so items with equal
+    keys leave the queue in the order they were pushed.
+    Each heap node has arity children (2 for a binary heap, 4 for
+    a 4-ary heap, which is shallower and moves fewer items).
+    """
+    def __init__(self, items=None, arity=2):
+        """
+        Create a priority queue, empty or holding the
+        (key, item) pairs of the passed in iterable, with the
+        heap order restored bottom up in O(n). Use from_items
+        instead to get the handles of the items too.
+        """
+        if arity < 2:
+            raise ValueError("arity must be at least 2")
+        self._arity = arity
+        self._prios = []
+        self._items = []
+        self._handles = []
+        self._count = 0
+        if items is not None:
+            self._load(items)
+
+    @classmethod
+    def from_items(cls, items, arity=2):
+        """
+        Create a priority queue holding the (key, item) pairs of
+        the passed in iterable, as the constructor does, and return
+        the tuple (queue, handles), with the PQHandle of each item
+        in the order the pairs were given
+        """
+        pq = cls(arity=arity)
+        handles = pq._load(items)
+        return pq, handles
+
+    def __len__(self):
+        """
+        Return the number of items in the queue
+        """
+        return len(self._prios)
+
+    def push(self, key, item):
+        """
+        Add the item with the passed in key to the queue
+        and return its PQHandle
+        """
+        handle = PQHandle(len(self))
+        self._prios.append((key, self._count))
+        self._items.append(item)
+        self._handles.append(handle)
+        self._count += 1
+        self._sift_up(len(self) - 1)
+        return handle
+
+    def pop(self):
+        """
+        Remove the item with the smallest key and return
+        the tuple (key, item), or None if the queue is empty
+        """
+        if len(self) == 0:
+            return None
+        prio = self._prios[0]
+        item = self._items[0]
+        self._handles[0].index = -1
+
+        last_prio = self._prios.pop()
+        last_item = self._items.pop()
+        last_handle = self._handles.pop()
+        if len(self) > 0:
+            self._prios[0] = last_prio
+            self._items[0] = last_item
+            self._handles[0] = last_handle
+            self._sift_down(0)
+        return prio[0], item
+
+    def peek(self):
+        """
+        Return the tuple (key, item) with the smallest key,
+        or None if the queue is empty
+        """
+        if len(self) == 0:
+            return None
+        return self._prios[0][0], self._items[0]
+
+    def get_key(self, handle):
+        """
+        Return the key of the item with the passed in handle
+        """
+        return self._prios[self._position(handle)][0]
+
+    def decrease_key(self, handle, key):
+        """
+        Lower the key of the item with the passed in handle
+        and move the item up the heap to its new place
+        """
+        index = self._position(handle)
+        old_key, seq = self._prios[index]
+        if key > old_key:
+            raise ValueError("decrease_key cannot increase a key")
+        self._prios[index] = (key, seq)
+        self._sift_up(index)
+
+    def _load(self, items):
+        """
+        Add the (key, item) pairs of the passed in iterable to the
+        empty queue, restore the heap order bottom up in O(n), and
+        return the list of their handles in the order given
+        """
+        for key, item in items:
+            self._prios.append((key, self._count))
+            self._items.append(item)
+            self._handles.append(PQHandle(self._count))
+            self._count += 1
+        handles = list(self._handles)
+        for index in range((len(self) - 2) // self._arity, -1, -1):
+            self._sift_down(index)
+        return handles
+
+    def _position(self, handle):
+        """
+        Return the heap position of the item with the passed in
+        handle, checking that the item is still in this queue
+        """
+        index = handle.index
+        if index < 0 or index >= len(self) or self._handles[index] is not handle:
+            raise ValueError("The item is not in the priority queue")
+        return index
+
+    def _sift_up(self, index):
+        """
+        Move the item at index up while its parent has a bigger
+        key. The parents are moved down into the hole left by the
+        item, which is only put in place once.
+        """
+        prios = self._prios
+        items = self._items
+        handles = self._handles
+        prio = prios[index]
+        item = items[index]
+        handle = handles[index]
+        while index > 0:
+            parent = (index - 1) // self._arity
+            if prios[parent] <= prio:
+                break
+            prios[index] = prios[parent]
+            items[index] = items[parent]
+            handles[index] = handles[parent]
+            handles[index].index = index
+            index = parent
+        prios[index] = prio
+        items[index] = item
+        handles[index] = handle
+        handle.index = index
+
+    def _sift_down(self, index):
+        """
+        Move the item at index down while its smallest child has
+        a smaller key, moving the children up into the hole
+        """
+        prios = self._prios
+        items = self._items
+        handles = self._handles
+        size = len(prios)
+        prio = prios[index]
+        item = items[index]
+        handle = handles[index]
+        while True:
+            first = self._arity * index + 1
+            if first >= size:
+                break
+            child = min(range(first, min(first + self._arity, size)),
+                        key=prios.__getitem__)
+            if prios[child] >= prio:
+                break
+            prios[index] = prios[child]
+            items[index] = items[child]
+            handles[index] = handles[child]
+            handles[index].index = index
+            index = child
+        prios[index] = prio
+        items[index] = item
+        handles[index] = handle
+        handle.index = index
@@ -1,9 +1,12 @@
 from set import Set
+from instrument import current_instrument
 
 
 class Map:
     """
     Python List Implementation for Map ADT
+    Inside an instrumented() scope, the entries looked at to
+    find a key are counted as 'map_probes'
     """
     def __init__(self):
         """
@@ -11,6 +14,17 @@ class Map:
         """
         self._map_entries = list()
 
+    @classmethod
+    def from_items(cls, items):
+        """
+        Creates a map holding the passed in items: a Map, or
+        an iterable of (key, value) pairs. A key given more than
+        once gets the last value given for it.
+        """
+        new_map = cls()
+        new_map.update(items)
+        return new_map
+
     def __len__(self):
         """
         Returns the number of entries in the map
@@ -47,7 +61,7 @@ class Map:
         """
         position = self._find_position(key)
         if position is not None: 
-            return self._map_entries[position].value
+            return self._value_at(position)
         else:
             return None
 
@@ -61,39 +75,80 @@ class Map:
             return self._map_entries.pop(position)
         else:
             return None
+
+    def update(self, items):
+        """
+        Adds each of the passed in items to the map: the entries
+        of a Map, or an iterable of (key, value) pairs.
+        Returns the number of keys that were not in the map.
+        """
+        if isinstance(items, Map):
+            items = items.items()
+        num_added = 0
+        for key, value in items:
+            if self.add(key, value):
+                num_added += 1
+        return num_added
+
+    def get_many(self, keys, default=None):
+        """
+        Returns a list of the values associated with each of the
+        passed in keys, with default for the keys not in the map
+        """
+        values = []
+        for key in keys:
+            position = self._find_position(key)
+            if position is not None:
+                values.append(self._value_at(position))
+            else:
+                values.append(default)
+        return values
             
     def __iter__(self):
         """
-        Returns an iterator for traversing the keys in the map.
+        Returns an iterator for traversing the entries in the map.
+        """
+        return iter(self._map_entries)
+
+    def keys(self):
+        """
+        Returns a live view of the keys in the map
         """
-        return MapIterator(self._map_entries)
+        return MapKeysView(self)
+
+    def values(self):
+        """
+        Returns a live view of the values in the map
+        """
+        return MapValuesView(self)
+
+    def items(self):
+        """
+        Returns a live view of the (key, value) pairs in the map
+        """
+        return MapItemsView(self)
 
     def get_entry_set(self):
         """
         Returns a set of each MapEntry object in the Map
+        Each entry is only in the map once, so they are added
+        to the set without checking them against each other.
         """
-        entry_set = Set()
-        for entry in self:
-            entry_set.add(entry)
-        return entry_set
+        return Set.from_distinct(self)
         
     def get_key_set(self):
         """
         Returns a set of all the keys in Map
+        Each key is only in the map once, so they are added
+        to the set without checking them against each other.
         """
-        key_set = Set()
-        for entry in self:
-            key_set.add(entry.key)
-        return key_set
+        return Set.from_distinct(self.keys())
         
     def get_value_set(self):
         """
         Returns a set of all the values in Map
         """
-        value_set = Set()
-        for entry in self:
-            value_set.add(entry.value)
-        return value_set
+        return Set.from_items(self.values())
         
     def __str__(self):
         """
@@ -104,21 +159,39 @@ class Map:
             map_str += str(entry) + " "
         return map_str + "}"
     
+    def _value_at(self, position):
+        """
+        Returns the value of the entry at position
+        """
+        return self._map_entries[position].value
+
     def _find_position(self, key):
         """
         Returns the position of a passed in key, or None, 
         if the key is not in the map
         """
+        position = None
         for pos in range(len(self)):
             if self._map_entries[pos].key == key:
-                return pos
-        return None
+                position = pos
+                break
+
+        instrument = current_instrument()
+        if instrument is not None:
+            if position is None:
+                instrument.count('map_probes', len(self))
+            else:
+                instrument.count('map_probes', position + 1)
+        return position
 
 
 class MapEntry:
     """
     The class for holding the key/value pairs.
+    Its __slots__ leave out the per instance __dict__.
     """
+    __slots__ = ('key', 'value')
+
     def __init__(self, key, value):
         """
         Creates a MapEntry with the passed in key/value pair
@@ -133,32 +206,87 @@ class MapEntry:
         return str(self.key) + " : " + str(self.value)
         
 
-class MapIterator:
+class MapView:
     """
-    An iterator for the Set ADT implemented as a Python list.
+    A live view of a Map: it holds no copy of the entries, so it
+    always reflects the current contents of the map. Each pass
+    over the view is a generator walking the entries of the map.
     """
     def __init__(self, the_map):
         """
-        Initialize the list, from the one passed in
-        Set the current item to index 0
+        Create a view of the passed in map
+        """
+        self._map = the_map
+
+    def __len__(self):
+        """
+        Returns the number of entries in the map
+        """
+        return len(self._map)
+
+    def __str__(self):
+        """
+        Returns a string representation of the items in the view
         """
-        self._map_entries = the_map
-        self._cur_entry = 0
+        return str(list(self))
 
+
+class MapKeysView(MapView):
+    """
+    A live view of the keys of a Map
+    """
     def __iter__(self):
         """
-        Return this iterator
+        Generate the keys of the map
         """
-        return self
+        for entry in self._map:
+            yield entry.key
 
-    def __next__(self):
+    def __contains__(self, key):
         """
-        Initialize the list, from the one passed in
-        Set the current item to index 0
+        Returns True if the map contains the passed in key
         """
-        if self._cur_entry < len(self._map_entries):
-            item = self._map_entries[self._cur_entry]
-            self._cur_entry += 1
-            return item
-        else:
-            raise StopIteration
+        return key in self._map
+
+
+class MapValuesView(MapView):
+    """
+    A live view of the values of a Map
+    """
+    def __iter__(self):
+        """
+        Generate the values of the map
+        """
+        for entry in self._map:
+            yield entry.value
+
+    def __contains__(self, value):
+        """
+        Returns True if the map has an entry with the passed in value
+        """
+        for entry in self._map:
+            if entry.value == value:
+                return True
+        return False
+
+
+class MapItemsView(MapView):
+    """
+    A live view of the (key, value) pairs of a Map
+    """
+    def __iter__(self):
+        """
+        Generate the (key, value) pairs of the map
+        """
+        for entry in self._map:
+            yield entry.key, entry.value
+
+    def __contains__(self, item):
+        """
+        Returns True if the map contains the key of the passed
+        in (key, value) pair, with that value
+        """
+        key, value = item
+        if key not in self._map:
+            return False
+        return self._map.get_value(key) == value
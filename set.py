@@ -1,6 +1,11 @@
+from instrument import current_instrument
+
+
 class Set:
     """    
     Set Python List Implementation
+    Inside an instrumented() scope, the items looked at to
+    find an item are counted as 'set_probes'
     """
     def __init__(self):
         """
@@ -8,6 +13,38 @@ class Set:
         """
         self._items = list()
 
+    @classmethod
+    def from_distinct(cls, items):
+        """
+        Creates a set of the passed in items, which the caller
+        knows are all different, such as the keys of a Map,
+        so they are added in O(n) without checking each of them
+        against the items already in the set
+        """
+        new_set = cls()
+        new_set._items.extend(items)
+        return new_set
+
+    @classmethod
+    def from_items(cls, items):
+        """
+        Creates a set of the passed in items, dropping repeated
+        ones. Hashable items are told apart with a Python set in
+        O(n); other items are checked against the set one by one.
+        """
+        new_set = cls()
+        seen = set()
+        for item in items:
+            try:
+                if item in seen:
+                    continue
+                seen.add(item)
+                new_set._items.append(item)
+            except TypeError:
+                if item not in new_set._items:
+                    new_set._items.append(item)
+        return new_set
+
     def __len__(self):
         """
         Returns the number of items in the set
@@ -19,22 +56,43 @@ class Set:
         Returns True if the set contains the passed in item
         and False, otherwise
         """
-        return item in self._items
+        return self._find_position(item) is not None
 
     def add(self, item):
         """
         Adds a new item to the set, 
         if the item is not already in the set
         """
-        if item not in self._items:
+        if self._find_position(item) is None:
             self._items.append(item)
 
     def remove(self, item):
         """
         Removes an item from the set, if it exists in the set
         """
-        if item in self._items:
-            self._items.remove(item)
+        position = self._find_position(item)
+        if position is not None:
+            del self._items[position]
+
+    def _find_position(self, item):
+        """
+        Returns the position of the passed in item, or None,
+        if the item is not in the set. The items looked at by
+        the search are counted when there is an instrumented()
+        scope.
+        """
+        try:
+            position = self._items.index(item)
+        except ValueError:
+            position = None
+
+        instrument = current_instrument()
+        if instrument is not None:
+            if position is None:
+                instrument.count('set_probes', len(self._items))
+            else:
+                instrument.count('set_probes', position + 1)
+        return position
 
     def __str__(self):
         """
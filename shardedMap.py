@@ -0,0 +1,174 @@
+import threading
+
+from map import Map, MapEntry
+from hashMap import HashMap
+
+
+class ShardedMap(Map):
+    """
+    Thread-safe Implementation for Map ADT
+    The entries are spread over num_shards maps (HashMaps, unless
+    another shard_class is given) by the hash of their key, and
+    each shard has its own lock, held for every operation on it.
+    Threads working on keys of different shards do not wait for
+    each other, unlike with one lock around the whole map.
+    Besides the methods of Map, it has increment, an atomic read
+    and add for counter values, and merge, which adds the counts
+    of another map in one lock acquisition per shard, so threads
+    or processes can each count into their own map and merge
+    the results into one.
+    Iterating gives a copy of the entries of one shard at a time,
+    so it never blocks the other threads for the whole map, and
+    does not follow the order the keys were added in.
+    """
+    def __init__(self, num_shards=16, shard_class=HashMap):
+        """
+        Creates an empty map of num_shards shards
+        """
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+        super().__init__()
+        self._shard_class = shard_class
+        self._shards = [shard_class() for index in range(num_shards)]
+        self._locks = [threading.Lock() for index in range(num_shards)]
+
+    def __len__(self):
+        """
+        Returns the number of entries in the map
+        """
+        size = 0
+        for index in range(len(self._shards)):
+            with self._locks[index]:
+                size += len(self._shards[index])
+        return size
+
+    def __contains__(self, key):
+        """
+        Returns True if the map contains the passed in key
+        and False, otherwise
+        """
+        index = self._shard_index(key)
+        with self._locks[index]:
+            return key in self._shards[index]
+
+    def __iter__(self):
+        """
+        Returns an iterator for traversing the entries in the map,
+        copied from one shard at a time
+        """
+        for index in range(len(self._shards)):
+            with self._locks[index]:
+                entries = [MapEntry(entry.key, entry.value) for entry in self._shards[index]]
+            for entry in entries:
+                yield entry
+
+    def __getstate__(self):
+        """
+        Returns the state to pickle: the locks cannot be pickled,
+        and the shard of a key depends on hash(), which for strings
+        differs between processes, so the entries are pickled as
+        (key, value) pairs
+        """
+        return len(self._shards), self._shard_class, [(entry.key, entry.value) for entry in self]
+
+    def __setstate__(self, state):
+        """
+        Restore a pickled map, placing the keys in their shards again
+        """
+        num_shards, shard_class, items = state
+        self.__init__(num_shards, shard_class)
+        self.update(items)
+
+    def add(self, key, value):
+        """
+        Adds a new entry to the map if the passed in key
+        does not exist. Otherwise, the value replaces the
+        current value associated with the key.
+        """
+        index = self._shard_index(key)
+        with self._locks[index]:
+            return self._shards[index].add(key, value)
+
+    def get_value(self, key):
+        """
+        Returns the value associated with the passed in key,
+        if the key is in the map
+        """
+        index = self._shard_index(key)
+        with self._locks[index]:
+            return self._shards[index].get_value(key)
+
+    def get_many(self, keys, default=None):
+        """
+        Returns a list of the values associated with each of the
+        passed in keys, with default for the keys not in the map
+        """
+        values = []
+        for key in keys:
+            index = self._shard_index(key)
+            with self._locks[index]:
+                shard = self._shards[index]
+                if key in shard:
+                    values.append(shard.get_value(key))
+                else:
+                    values.append(default)
+        return values
+
+    def remove(self, key):
+        """
+        Removes the entry associated with the passed in key.
+        if the key is in the map
+        """
+        index = self._shard_index(key)
+        with self._locks[index]:
+            return self._shards[index].remove(key)
+
+    def increment(self, key, amount=1):
+        """
+        Add amount to the value of key, a key not in the map
+        counting as 0, and return the new value. The shard lock
+        is held throughout, so no increment is lost when threads
+        increment the same key.
+        """
+        index = self._shard_index(key)
+        with self._locks[index]:
+            shard = self._shards[index]
+            value = shard.get_value(key)
+            if value is None:
+                value = amount
+            else:
+                value += amount
+            shard.add(key, value)
+            return value
+
+    def merge(self, counts):
+        """
+        Add the values of counts to the values of the same keys
+        in this map, as increment does. counts can be a Map,
+        a dictionary (such as a Counter), or an iterable of
+        (key, amount) pairs. The pairs are grouped by shard,
+        so each shard lock is taken once.
+        """
+        if hasattr(counts, 'items'):
+            counts = counts.items()
+        groups = [[] for index in range(len(self._shards))]
+        for key, amount in counts:
+            groups[self._shard_index(key)].append((key, amount))
+
+        for index in range(len(self._shards)):
+            if not groups[index]:
+                continue
+            with self._locks[index]:
+                shard = self._shards[index]
+                for key, amount in groups[index]:
+                    value = shard.get_value(key)
+                    if value is None:
+                        shard.add(key, amount)
+                    else:
+                        shard.add(key, value + amount)
+
+    def _shard_index(self, key):
+        """
+        Returns the index of the shard holding key
+        """
+        return hash(key) % len(self._shards)
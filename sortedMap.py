@@ -0,0 +1,325 @@
+import random
+
+from map import Map, MapEntry
+from instrument import current_instrument
+
+MAX_LEVEL = 32
+
+
+class SkipNode:
+    """
+    A node of the SkipList behind SortedMap:
+      - entry: the MapEntry of the node, None for the head node
+      - forward: the next node on each level the node is on
+      - widths: the number of entries each forward link skips
+        over, counting the entry it lands on
+    """
+    __slots__ = ('entry', 'forward', 'widths')
+
+    def __init__(self, entry, level):
+        """
+        Create a node on the bottom level levels of the skip list
+        """
+        self.entry = entry
+        self.forward = [None] * level
+        self.widths = [1] * level
+
+
+class SortedMap(Map):
+    """
+    Skip List Implementation for Map ADT, keeping the entries
+    sorted by key. It has the methods of Map, iterating over the
+    entries in key order, plus range queries and order statistics:
+    range, floor, ceiling, rank, select, get_min and get_max.
+    All of them take O(log n) expected time, the range query
+    O(log n) plus the number of entries in the range.
+    Each node is on the bottom level and on each level above it
+    with probability 1/2, so a search drops down the levels
+    skipping about half of the remaining entries at each one.
+    Each link records how many entries it skips over, which
+    turns a search into the rank of its key and lets select
+    find the entry at a rank the same way.
+    The keys must all be comparable with each other. Inside an
+    instrumented() scope, the keys compared while searching are
+    counted as 'map_probes'.
+    """
+    def __init__(self, seed=None):
+        """
+        Creates an empty map; seed fixes the random node levels
+        """
+        super().__init__()
+        self._head = SkipNode(None, MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+        self._random = random.Random(seed)
+
+    def __len__(self):
+        """
+        Returns the number of entries in the map
+        """
+        return self._size
+
+    def __contains__(self, key):
+        """
+        Returns True if the map contains the passed in key
+        and False, otherwise
+        """
+        return self._find_node(key) is not None
+
+    def __iter__(self):
+        """
+        Returns an iterator for traversing the entries
+        in the map, in key order
+        """
+        return self._iter_from(self._head.forward[0], None)
+
+    def add(self, key, value):
+        """
+        Adds a new entry to the map if the passed in key
+        does not exist. Otherwise, the value replaces the
+        current value associated with the key.
+        """
+        update, ranks = self._search(key)
+        node = update[0].forward[0]
+        if node is not None and node.entry.key == key:
+            node.entry.value = value
+            return False
+
+        new_level = self._random_level()
+        for level in range(self._level, new_level):
+            update[level] = self._head
+            ranks[level] = 0
+            self._head.forward[level] = None
+            self._head.widths[level] = self._size + 1
+        self._level = max(self._level, new_level)
+
+        # the new node goes right after update[0], at rank position
+        position = ranks[0] + 1
+        node = SkipNode(MapEntry(key, value), new_level)
+        for level in range(self._level):
+            prev = update[level]
+            if level < new_level:
+                node.forward[level] = prev.forward[level]
+                node.widths[level] = ranks[level] + prev.widths[level] + 1 - position
+                prev.forward[level] = node
+                prev.widths[level] = position - ranks[level]
+            else:
+                prev.widths[level] += 1
+        self._size += 1
+        return True
+
+    def get_value(self, key):
+        """
+        Returns the value associated with the passed in key,
+        if the key is in the map
+        """
+        node = self._find_node(key)
+        if node is not None:
+            return node.entry.value
+        else:
+            return None
+
+    def get_many(self, keys, default=None):
+        """
+        Returns a list of the values associated with each of the
+        passed in keys, with default for the keys not in the map
+        """
+        values = []
+        for key in keys:
+            node = self._find_node(key)
+            if node is not None:
+                values.append(node.entry.value)
+            else:
+                values.append(default)
+        return values
+
+    def remove(self, key):
+        """
+        Removes the entry associated with the passed in key.
+        if the key is in the map
+        """
+        update, ranks = self._search(key)
+        node = update[0].forward[0]
+        if node is None or node.entry.key != key:
+            return None
+
+        for level in range(self._level):
+            prev = update[level]
+            if prev.forward[level] is node:
+                prev.widths[level] += node.widths[level] - 1
+                prev.forward[level] = node.forward[level]
+            else:
+                prev.widths[level] -= 1
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+        self._size -= 1
+        return node.entry
+
+    def range(self, lo=None, hi=None):
+        """
+        Returns an iterator over the entries with keys from lo
+        up to but not including hi, in key order. A lo or hi
+        of None leaves that end of the range open.
+        """
+        if lo is None:
+            start = self._head.forward[0]
+        else:
+            start = self._search(lo)[0][0].forward[0]
+        return self._iter_from(start, hi)
+
+    def floor(self, key):
+        """
+        Returns the entry with the greatest key less than or
+        equal to the passed in key, or None if there is none
+        """
+        prev = self._search(key)[0][0]
+        node = prev.forward[0]
+        if node is not None and node.entry.key == key:
+            return node.entry
+        return prev.entry
+
+    def ceiling(self, key):
+        """
+        Returns the entry with the least key greater than or
+        equal to the passed in key, or None if there is none
+        """
+        node = self._search(key)[0][0].forward[0]
+        if node is not None:
+            return node.entry
+        return None
+
+    def rank(self, key):
+        """
+        Returns the number of keys in the map less than the
+        passed in key, which is the index of key in key order
+        when it is in the map
+        """
+        return self._search(key)[1][0]
+
+    def select(self, index):
+        """
+        Returns the entry at the passed in index in key order;
+        a negative index counts back from the greatest key
+        """
+        if index < 0:
+            index += self._size
+        if index < 0 or index >= self._size:
+            raise IndexError("SortedMap index out of range")
+
+        # rank positions start at 1, the head node is at 0
+        target = index + 1
+        node = self._head
+        position = 0
+        for level in range(self._level - 1, -1, -1):
+            while node.forward[level] is not None and position + node.widths[level] <= target:
+                position += node.widths[level]
+                node = node.forward[level]
+        return node.entry
+
+    def get_min(self):
+        """
+        Returns the entry with the least key, or None if the map is empty
+        """
+        node = self._head.forward[0]
+        if node is not None:
+            return node.entry
+        return None
+
+    def get_max(self):
+        """
+        Returns the entry with the greatest key, or None if the map is empty
+        """
+        if self._size == 0:
+            return None
+        return self.select(-1)
+
+    def _find_position(self, key):
+        """
+        Returns the position of a passed in key in key order,
+        or None, if the key is not in the map
+        """
+        update, ranks = self._search(key)
+        node = update[0].forward[0]
+        if node is not None and node.entry.key == key:
+            return ranks[0]
+        return None
+
+    def _find_node(self, key):
+        """
+        Returns the node holding the passed in key,
+        or None, if the key is not in the map
+        """
+        node = self._head
+        probes = 0
+        for level in range(self._level - 1, -1, -1):
+            next_node = node.forward[level]
+            while next_node is not None:
+                probes += 1
+                if not next_node.entry.key < key:
+                    break
+                node = next_node
+                next_node = node.forward[level]
+        self._count_probes(probes)
+
+        node = node.forward[0]
+        if node is not None and node.entry.key == key:
+            return node
+        return None
+
+    def _search(self, key):
+        """
+        Search for the passed in key, returning two lists with
+        an item for each level of the skip list:
+          - update: the last node on the level with a key less
+            than key, where a new node for key would be linked in
+          - ranks: the rank position of that node, counting the
+            head node as 0 and the first entry as 1
+        """
+        update = [self._head] * MAX_LEVEL
+        ranks = [0] * MAX_LEVEL
+        node = self._head
+        position = 0
+        probes = 0
+        for level in range(self._level - 1, -1, -1):
+            next_node = node.forward[level]
+            while next_node is not None:
+                probes += 1
+                if not next_node.entry.key < key:
+                    break
+                position += node.widths[level]
+                node = next_node
+                next_node = node.forward[level]
+            update[level] = node
+            ranks[level] = position
+        self._count_probes(probes)
+        return update, ranks
+
+    def _iter_from(self, node, hi):
+        """
+        Generate the entries from node on along the bottom level,
+        stopping before the first key not less than hi, if any
+        """
+        while node is not None:
+            if hi is not None and not node.entry.key < hi:
+                return
+            yield node.entry
+            node = node.forward[0]
+
+    def _random_level(self):
+        """
+        Returns the number of levels for a new node: each
+        level above the first with probability 1/2
+        """
+        level = 1
+        while level < MAX_LEVEL and self._random.random() < 0.5:
+            level += 1
+        return level
+
+    def _count_probes(self, probes):
+        """
+        Count the keys a search compared, when there
+        is an instrumented() scope
+        """
+        instrument = current_instrument()
+        if instrument is not None:
+            instrument.count('map_probes', probes)
@@ -0,0 +1,24 @@
+import random
+
+from adaptiveHuffman import AdaptiveHuffEncoder, AdaptiveHuffDecoder
+
+
+def round_trip(text, piece_size):
+    encoder = AdaptiveHuffEncoder()
+    data = encoder.encode(text) + encoder.finish()
+    decoder = AdaptiveHuffDecoder()
+    pieces = [decoder.decode(data[start:start + piece_size])
+              for start in range(0, len(data), piece_size)]
+    return "".join(pieces), decoder.finished
+
+
+def test_round_trip_in_pieces():
+    text = "abracadabra, the quick brown fox jumps over the lazy dog" * 20
+    assert round_trip(text, 3) == (text, True)
+    assert round_trip("", 1) == ("", True)
+
+
+def test_large_alphabet():
+    rand = random.Random(1)
+    text = "".join(chr(0x4e00 + rand.randrange(6000)) for index in range(30000))
+    assert round_trip(text, 4096) == (text, True)
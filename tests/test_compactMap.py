@@ -0,0 +1,29 @@
+import pickle
+
+import pytest
+
+from compactMap import CompactMap
+
+
+def test_pickled_map_with_removals():
+    compact_map = CompactMap('q')
+    for key in range(100):
+        compact_map.add(key, key * 2)
+    for key in range(0, 100, 3):
+        compact_map.remove(key)
+
+    copy = pickle.loads(pickle.dumps(compact_map))
+    assert len(copy) == len(compact_map) == 66
+    assert [entry.key for entry in copy] == [entry.key for entry in compact_map]
+    assert copy.get_value(4) == 8
+    assert 3 not in copy
+    copy.add(3, 1)
+    assert copy.get_value(3) == 1
+
+
+def test_typed_values_reject_other_types():
+    compact_map = CompactMap('q')
+    with pytest.raises(TypeError):
+        compact_map.add('x', 1.5)
+    assert len(compact_map) == 0
+    assert 'x' not in compact_map
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from diskMap import DiskMap, PAGE_SIZE
+
+
+def test_file_size_stays_bounded_across_commits(tmp_path):
+    filename = str(tmp_path / "map.dat")
+    disk_map = DiskMap(filename, fsync=False)
+    sizes = []
+    for commit_num in range(3000):
+        disk_map.add(commit_num % 50, commit_num)
+        disk_map.commit()
+        if commit_num % 500 == 499:
+            sizes.append(os.path.getsize(filename))
+    disk_map.close()
+
+    assert sizes[-1] <= 64 * PAGE_SIZE
+    assert sizes[-1] == sizes[1]
+
+    disk_map = DiskMap(filename)
+    assert len(disk_map) == 50
+    assert disk_map.get_value(7) == 2957
+    disk_map.close()
+
+
+def test_crash_during_commit_keeps_last_commit(tmp_path):
+    filename = str(tmp_path / "map.dat")
+    disk_map = DiskMap(filename, fsync=False)
+    for key in range(500):
+        disk_map.add(key, str(key))
+    disk_map.commit()
+
+    for key in range(0, 500, 2):
+        disk_map.remove(key)
+    disk_map.add('new', 1)
+
+    def crash():
+        raise OSError("crash")
+    # the first flush of commit comes before the superblock is written
+    disk_map._sync = crash
+    with pytest.raises(OSError):
+        disk_map.commit()
+    disk_map._file.close()
+
+    disk_map = DiskMap(filename)
+    assert len(disk_map) == 500
+    assert sorted(entry.key for entry in disk_map) == list(range(500))
+    assert disk_map.get_value(4) == '4'
+    assert 'new' not in disk_map
+    disk_map.add('new', 2)
+    disk_map.close()
+
+    disk_map = DiskMap(filename)
+    assert len(disk_map) == 501
+    assert disk_map.get_value('new') == 2
+    assert disk_map.get_value(499) == '499'
+    disk_map.close()
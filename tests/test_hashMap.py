@@ -0,0 +1,61 @@
+import pickle
+import random
+
+import pytest
+
+from hashMap import HashMap
+
+
+def test_matches_dict_through_adds_and_removals():
+    rng = random.Random(11)
+    hash_map = HashMap()
+    expected = {}
+    for step in range(20000):
+        key = rng.randrange(3000)
+        if rng.random() < 0.6:
+            assert hash_map.add(key, step) == (key not in expected)
+            expected[key] = step
+        else:
+            entry = hash_map.remove(key)
+            if key in expected:
+                assert entry.key == key and entry.value == expected.pop(key)
+            else:
+                assert entry is None
+
+    assert len(hash_map) == len(expected)
+    # a key added again after removal goes to the end, as in a dict
+    assert [(entry.key, entry.value) for entry in hash_map] == list(expected.items())
+    assert hash_map.get_many(range(3000)) == [expected.get(key) for key in range(3000)]
+
+
+def test_table_grows_and_shrinks():
+    hash_map = HashMap()
+    for key in range(1000):
+        hash_map.add(str(key), key)
+    capacity = hash_map.get_capacity()
+    assert capacity * 2 / 3 >= 1000
+    for key in range(990):
+        hash_map.remove(str(key))
+    assert hash_map.get_capacity() <= capacity // 16
+    assert [entry.key for entry in hash_map] == [str(key) for key in range(990, 1000)]
+
+
+def test_pickled_map_with_removals():
+    hash_map = HashMap()
+    for key in range(100):
+        hash_map.add('k%d' % key, key)
+    for key in range(0, 100, 3):
+        hash_map.remove('k%d' % key)
+
+    copy = pickle.loads(pickle.dumps(hash_map))
+    assert len(copy) == 66
+    assert [entry.key for entry in copy] == [entry.key for entry in hash_map]
+    assert copy.get_value('k4') == 4
+    assert 'k3' not in copy
+    copy.add('k3', 1)
+    assert copy.get_value('k3') == 1
+
+
+def test_max_load_must_be_a_fraction():
+    with pytest.raises(ValueError):
+        HashMap(max_load=1)
@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+from huffBlocks import HuffBlocks
+
+
+def sample_text(length, seed):
+    rng = random.Random(seed)
+    return "".join(rng.choice("abcdefgh \né中") for index in range(length))
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_round_trip_of_several_blocks(max_workers):
+    blocks = HuffBlocks(block_size=1000, max_workers=max_workers)
+    text = sample_text(4500, max_workers)
+    data = blocks.compress(text)
+    kind, index = blocks.read_index(data)
+    assert [num_chars for offset, size, num_chars in index] == [1000] * 4 + [500]
+    assert blocks.decompress(data) == text
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_round_trip_of_bytes(max_workers):
+    blocks = HuffBlocks(block_size=700, max_workers=max_workers)
+    data = bytes(random.Random(3).choices(range(20), k=2000))
+    assert blocks.decompress(blocks.compress(data)) == data
+    assert blocks.decompress(blocks.compress(b'abc' * 10)) == b'abc' * 10
+
+
+def test_empty_input_keeps_its_type():
+    blocks = HuffBlocks(block_size=10, max_workers=1)
+    assert blocks.decompress(blocks.compress("")) == ""
+    assert blocks.decompress(blocks.compress(b"")) == b""
+
+
+def test_other_input_is_rejected():
+    with pytest.raises(TypeError):
+        HuffBlocks(max_workers=1).compress(["a", "b"])
@@ -0,0 +1,72 @@
+import sys
+import threading
+
+from huffCache import HuffCodeCache
+from huffman import Huffman
+
+
+def test_shared_cache_hits_and_decodes():
+    cache = HuffCodeCache()
+    text = "the quick brown fox jumps over the lazy dog " * 50
+    first = Huffman(code_cache=cache).compress_to_bytes(text)
+    stats = cache.get_stats()
+    assert stats['code_misses'] == 1 and stats['code_hits'] == 0
+
+    # the same symbols with nearly the same frequencies reuse the codes
+    similar = text + "the dog"
+    second = Huffman(code_cache=cache).compress_to_bytes(similar)
+    assert cache.get_stats()['code_hits'] == 1
+
+    assert Huffman(code_cache=cache).decompress_bytes(first) == text
+    assert Huffman(code_cache=cache).decompress_bytes(second) == similar
+    # both were compressed with the same codes, so share a decoder
+    stats = cache.get_stats()
+    assert stats['decoder_misses'] == 1 and stats['decoder_hits'] == 1
+    assert Huffman().decompress_bytes(second) == similar
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = HuffCodeCache(max_entries=2)
+    cache.put_code_lengths('a', [('a', 1)])
+    cache.put_code_lengths('b', [('b', 1)])
+    assert cache.get_code_lengths('a') == [('a', 1)]
+    cache.put_code_lengths('c', [('c', 1)])
+    assert cache.get_code_lengths('b') is None
+    assert cache.get_code_lengths('a') == [('a', 1)]
+    assert cache.get_code_lengths('c') == [('c', 1)]
+    assert cache.get_stats() == {'code_hits': 3, 'code_misses': 1,
+                                 'decoder_hits': 0, 'decoder_misses': 0,
+                                 'evictions': 1}
+    cache.clear()
+    assert len(cache) == 0 and cache.get_stats()['evictions'] == 0
+
+
+def test_threads_share_a_small_cache():
+    cache = HuffCodeCache(max_entries=1)
+    errors = []
+
+    def work(thread_num):
+        try:
+            for round_num in range(3000):
+                key = (thread_num + round_num) % 2
+                if cache.get_code_lengths(key) is None:
+                    cache.put_code_lengths(key, [(key, 1)])
+        except Exception as error:
+            errors.append(error)
+
+    switch_interval = sys.getswitchinterval()
+    # switch threads often, so a lookup races with the evictions
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=work, args=(thread_num,))
+                   for thread_num in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert errors == []
+    stats = cache.get_stats()
+    assert stats['code_hits'] + stats['code_misses'] == 8 * 3000
+    assert len(cache) == 1
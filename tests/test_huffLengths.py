@@ -0,0 +1,69 @@
+import heapq
+import random
+from fractions import Fraction
+
+import pytest
+
+from huffLengths import package_merge
+
+
+def untruncated_package_merge(freqs, max_length):
+    # package-merge keeping every item of every list
+    leaves = sorted([(freq, [index]) for index, freq in enumerate(freqs)],
+                    key=lambda item: item[0])
+    items = leaves
+    for level in range(max_length - 1):
+        packages = [(items[pos][0] + items[pos + 1][0], items[pos][1] + items[pos + 1][1])
+                    for pos in range(0, len(items) - 1, 2)]
+        items = sorted(leaves + packages, key=lambda item: item[0])
+    lengths = [0] * len(freqs)
+    for weight, symbols in items[:2 * len(freqs) - 2]:
+        for index in symbols:
+            lengths[index] += 1
+    return lengths
+
+
+def huffman_cost(freqs):
+    heap = list(freqs)
+    heapq.heapify(heap)
+    cost = 0
+    while len(heap) > 1:
+        merged = heapq.heappop(heap) + heapq.heappop(heap)
+        cost += merged
+        heapq.heappush(heap, merged)
+    return cost
+
+
+def test_matches_untruncated_package_merge():
+    rng = random.Random(6)
+    for case in range(300):
+        num_symbols = rng.randint(2, 40)
+        freqs = [int(rng.expovariate(0.01)) + 1 for index in range(num_symbols)]
+        max_length = rng.randint((num_symbols - 1).bit_length(), 12)
+        lengths = package_merge(freqs, max_length)
+        assert lengths == untruncated_package_merge(freqs, max_length)
+        assert max(lengths) <= max_length
+        assert sum(Fraction(1, 1 << length) for length in lengths) == 1
+
+
+def test_without_a_binding_limit_costs_as_much_as_huffman():
+    rng = random.Random(4)
+    for case in range(200):
+        freqs = [rng.randint(1, 1000) for index in range(rng.randint(2, 30))]
+        lengths = package_merge(freqs, 30)
+        assert sum(freq * length for freq, length in zip(freqs, lengths)) == huffman_cost(freqs)
+
+
+def test_limit_is_kept_for_skewed_frequencies():
+    freqs = [2 ** index for index in range(20)]
+    lengths = package_merge(freqs, 8)
+    assert max(lengths) == 8
+    assert sum(Fraction(1, 1 << length) for length in lengths) == 1
+    assert package_merge([5, 5, 5, 5], 2) == [2, 2, 2, 2]
+
+
+def test_small_and_too_many_symbols():
+    assert package_merge([], 4) == []
+    assert package_merge([7], 4) == [1]
+    with pytest.raises(ValueError):
+        package_merge([1] * 17, 4)
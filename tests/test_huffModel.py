@@ -0,0 +1,61 @@
+import pytest
+
+from huffModel import HuffModel
+from huffman import Huffman
+
+
+SAMPLES = ["the quick brown fox", "jumps over the lazy dog", "the end"]
+
+
+def trained_model():
+    model = HuffModel(max_code_len=6)
+    model.train(SAMPLES)
+    return model
+
+
+def test_round_trip_of_known_characters():
+    model = trained_model()
+    for message in SAMPLES + ["", "the fox and the dog"]:
+        assert model.decompress(model.compress(message)) == message
+    assert len(model.compress("the dog")) < len("the dog")
+
+
+def test_unseen_and_astral_characters_are_escaped():
+    model = trained_model()
+    message = "Zebra \U0001f600 naïve \U0010ffff" + "\ud800"
+    data = model.compress(message)
+    assert model.decompress(data) == message
+    # an escaped character takes more than its 21 bit code point
+    assert len(model.compress("\U0001f600")) * 8 > HuffModel.ESCAPE_BITS
+
+
+def test_codes_respect_max_code_len():
+    model = HuffModel(max_code_len=4)
+    model.train(["abcdefghij" * (index + 1) for index in range(5)])
+    assert max(length for symbol, length in model._code_lengths) <= 4
+
+
+def test_to_bytes_and_save_keep_the_codes(tmp_path):
+    model = trained_model()
+    message = "the lazy fox ~"
+    data = model.compress(message)
+
+    copy = HuffModel.from_bytes(model.to_bytes())
+    assert copy.compress(message) == data
+    assert copy.decompress(data) == message
+
+    filename = str(tmp_path / "model.bin")
+    model.save(filename)
+    loaded = HuffModel.load(filename)
+    assert loaded.compress(message) == data
+    assert loaded.decompress(data) == message
+
+
+def test_untrained_model_raises():
+    model = HuffModel()
+    with pytest.raises(ValueError):
+        model.compress("a")
+    with pytest.raises(ValueError):
+        model.decompress(b"")
+    with pytest.raises(ValueError):
+        HuffModel.from_bytes(Huffman().compress_to_bytes("not a model"))
@@ -0,0 +1,88 @@
+import bisect
+import random
+
+from huffElement import HuffElement
+from huffPQ import HuffPQ
+from huffTree import HuffTree
+from huffman import Huffman
+
+
+def leaf(freq):
+    element = HuffElement('x')
+    element.set_freq(freq)
+    return HuffTree(element)
+
+
+def freq(tree):
+    return tree.get_root().get_freq()
+
+
+def test_matches_sorted_reference():
+    rng = random.Random(2)
+    start = [rng.randrange(50) for index in range(20)]
+    huff_pq = HuffPQ([leaf(value) for value in start])
+    expected = sorted(start)
+    for step in range(5000):
+        operation = rng.randrange(5)
+        value = rng.randrange(50)
+        if operation == 0:
+            huff_pq.enqueue(leaf(value))
+            bisect.insort(expected, value)
+        elif operation == 1:
+            tree = huff_pq.dequeue()
+            if expected:
+                assert freq(tree) == expected.pop(0)
+            else:
+                assert tree is None
+        elif operation == 2:
+            bisect.insort(expected, value)
+            assert freq(huff_pq.pushpop(leaf(value))) == expected.pop(0)
+        elif operation == 3:
+            tree = huff_pq.replace(leaf(value))
+            if expected:
+                assert freq(tree) == expected.pop(0)
+            else:
+                assert tree is None
+            bisect.insort(expected, value)
+        else:
+            tree = huff_pq.peek()
+            if expected:
+                assert freq(tree) == expected[0]
+            else:
+                assert tree is None
+        assert len(huff_pq) == len(expected)
+
+    drained = []
+    while len(huff_pq) > 0:
+        drained.append(freq(huff_pq.dequeue()))
+    assert drained == expected
+
+
+def test_empty_queue():
+    huff_pq = HuffPQ()
+    assert huff_pq.peek() is None
+    assert huff_pq.dequeue() is None
+    tree = leaf(3)
+    assert huff_pq.pushpop(tree) is tree
+    assert len(huff_pq) == 0
+    assert huff_pq.replace(tree) is None
+    assert huff_pq.peek() is tree
+
+
+def coded_bits(node, depth=0):
+    if node.left is None:
+        return node.get_freq() * max(depth, 1)
+    return coded_bits(node.left, depth + 1) + coded_bits(node.right, depth + 1)
+
+
+def test_heap_built_tree_costs_as_much_as_sorted_tree():
+    # build_codes uses build_sorted_huff_tree, so this keeps
+    # build_huff_tree, the HuffPQ way, building optimal trees too
+    rng = random.Random(9)
+    text = "".join(chr(97 + min(int(rng.expovariate(0.3)), 25)) for index in range(5000))
+    huff = Huffman()
+    huff.build_huff_map(text)
+    huff.build_huff_tree()
+    heap_bits = coded_bits(huff.huff_tree.root)
+    huff.build_sorted_huff_tree()
+    assert coded_bits(huff.huff_tree.root) == heap_bits
@@ -0,0 +1,96 @@
+import os
+import random
+
+import pytest
+
+from huffman import Huffman, map_file, tokenize
+from huffNumpy import NUMPY_EXISTS
+
+
+def test_compress_file_stores_incompressible_data(tmp_path):
+    in_filename = str(tmp_path / "random.bin")
+    out_filename = str(tmp_path / "random.huf")
+    back_filename = str(tmp_path / "random.out")
+    data = os.urandom(1 << 16)
+    with open(in_filename, 'wb') as in_file:
+        in_file.write(data)
+
+    huff = Huffman(min_saving=0.1)
+    huff.compress_file(in_filename, out_filename)
+    assert huff.stored
+    with open(out_filename, 'rb') as out_file:
+        assert out_file.read() == Huffman(min_saving=0.1).compress_to_bytes(data)
+
+    Huffman().decompress_file(out_filename, back_filename)
+    with open(back_filename, 'rb') as back_file:
+        assert back_file.read() == data
+
+
+@pytest.mark.skipif(not NUMPY_EXISTS, reason="needs NumPy")
+def test_numpy_decoder_matches_table_decoder():
+    rand = random.Random(2)
+    alphabet = [chr(rand.randint(32, 3000)) for index in range(200)]
+    weights = [rand.random() ** 4 for symbol in alphabet]
+    text = ''.join(rand.choices(alphabet, weights, k=300000))
+    for data in (text, text.encode('utf-8'), tokenize(text[:50000]), 'a' * 100000):
+        compressed = Huffman(use_numpy=False).compress_to_bytes(data)
+        expected = Huffman(use_numpy=False).decompress_bytes(compressed)
+        assert Huffman().decompress_bytes(compressed) == expected
+
+    huff = Huffman()
+    packed, num_bits = huff.compress(text, packed=True)
+    assert huff.decompress(packed, num_bits) == text
+    huff.use_numpy = False
+    assert huff.decompress(packed, num_bits) == text
+
+
+def test_compress_words_keeps_the_type_of_empty_data():
+    assert Huffman().decompress_bytes(Huffman().compress_words(b'')) == b''
+    assert Huffman().decompress_bytes(Huffman().compress_words('')) == ''
+
+
+def test_decompress_range_of_stored_tokens_keeps_their_boundaries():
+    # tokens that tokenize would split differently
+    tokens = ['ab', 'c d', 'éf', '', 'g'] * 3
+    data = Huffman(min_saving=0.99).compress_to_bytes(tokens)
+    huff = Huffman()
+    for start in range(len(tokens) + 1):
+        for stop in range(start, len(tokens) + 2):
+            assert huff.decompress_range(data, start, stop) == ''.join(tokens[start:stop])
+    assert huff.decompress_bytes(data) == ''.join(tokens)
+
+    byte_tokens = [b'\x00\x01', b'xy z'] * 3
+    data = Huffman(min_saving=0.99).compress_to_bytes(byte_tokens)
+    assert Huffman().decompress_range(data, 1, 4) == b''.join(byte_tokens[1:4])
+
+
+def test_decompress_range_of_stored_text_and_bytes():
+    rand = random.Random(8)
+    # multi byte characters straddle the 64 KiB chunks decoded
+    text = ''.join(rand.choice('aé中\U0001f600') for index in range(40000))
+    data = Huffman(min_saving=0.99).compress_to_bytes(text)
+    huff = Huffman()
+    for start, stop in [(0, 0), (0, 5), (16380, 16390), (21000, 39999), (39990, 40010),
+                        (40000, 40005)]:
+        assert huff.decompress_range(data, start, stop) == text[start:stop]
+
+    raw = bytes(rand.randrange(256) for index in range(5000))
+    data = Huffman(min_saving=0.99).compress_to_bytes(raw)
+    assert Huffman().decompress_range(data, 100, 4000) == raw[100:4000]
+
+
+def test_decompress_range_reads_the_header_of_a_reused_buffer():
+    huff = Huffman()
+    buffer = bytearray(Huffman().compress_to_bytes('abracadabra', sync_interval=4))
+    assert huff.decompress_range(buffer, 2, 6) == 'raca'
+    buffer[:] = Huffman().compress_to_bytes('mississippi river', sync_interval=4)
+    assert huff.decompress_range(buffer, 2, 6) == 'ssis'
+
+
+def test_map_file_closes_the_mapping(tmp_path):
+    filename = str(tmp_path / "data.bin")
+    with open(filename, 'wb') as out_file:
+        out_file.write(b'abc')
+    with map_file(filename) as data:
+        assert data[:] == b'abc'
+    assert data.closed
@@ -0,0 +1,85 @@
+import threading
+from types import SimpleNamespace
+
+import instrument
+from instrument import Instrument, current_instrument, instrumented, stage, timed
+from set import Set
+
+
+def test_nothing_is_recorded_outside_a_scope():
+    assert current_instrument() is None
+    items = Set()
+    items.add(1)
+    with instrumented() as stats:
+        assert 1 in items
+    assert 2 not in items
+    assert stats.counts == {'set_probes': 1}
+
+
+def test_set_probes_count_the_items_searched():
+    items = Set.from_distinct(range(10))
+    with instrumented() as stats:
+        assert 3 in items
+        assert 42 not in items
+        items.add(42)
+        items.remove(0)
+        items.remove(99)
+    assert stats.get_count('set_probes') == 4 + 10 + 10 + 1 + 10
+    assert list(items._items) == list(range(1, 10)) + [42]
+
+
+def test_nested_scopes_record_in_the_innermost():
+    items = Set.from_distinct(range(5))
+    outer = Instrument()
+    with instrumented(outer) as stats:
+        assert stats is outer
+        items.add(0)
+        with instrumented() as inner:
+            items.add(4)
+            assert current_instrument() is inner
+        items.add(1)
+        assert current_instrument() is outer
+    assert current_instrument() is None
+    assert outer.get_count('set_probes') == 1 + 2
+    assert inner.get_count('set_probes') == 5
+
+
+def test_threads_record_in_their_own_scopes():
+    items = Set.from_distinct(range(100))
+    results = {}
+
+    def work(thread_num):
+        with instrumented() as stats:
+            for round_num in range(200):
+                items.add(thread_num)
+        results[thread_num] = stats.get_count('set_probes')
+
+    with instrumented() as main_stats:
+        threads = [threading.Thread(target=work, args=(thread_num,)) for thread_num in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert results == {thread_num: 200 * (thread_num + 1) for thread_num in range(8)}
+    # a new thread does not record into the scope it was started from
+    assert main_stats.counts == {}
+
+
+def test_timed_records_only_the_outermost_call(monkeypatch):
+    clock = iter(range(1000))
+    # every reading of the clock moves it one second on
+    monkeypatch.setattr(instrument, 'time', SimpleNamespace(perf_counter=lambda: next(clock)))
+
+    @timed('walk')
+    def walk(depth):
+        if depth > 0:
+            walk(depth - 1)
+
+    with instrumented() as stats:
+        walk(5)
+        walk(0)
+        with stage('other'):
+            walk(3)
+    assert stats.get_time('walk') == 3
+    assert stats.get_time('other') == 3
+    assert stats.active == set()
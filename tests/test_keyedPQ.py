@@ -0,0 +1,70 @@
+import heapq
+import random
+
+import pytest
+
+from keyedPQ import KeyedPQ
+
+
+@pytest.mark.parametrize("arity", [2, 4])
+def test_pop_order_matches_heapq(arity):
+    rng = random.Random(arity)
+    pq = KeyedPQ(arity=arity)
+    heap = []
+    for step in range(3000):
+        if rng.random() < 0.6:
+            key = rng.randrange(1000)
+            pq.push(key, step)
+            heapq.heappush(heap, (key, step))
+        else:
+            expected = heapq.heappop(heap) if heap else None
+            assert pq.pop() == expected
+    assert len(pq) == len(heap)
+    assert pq.peek() == heap[0]
+    while heap:
+        assert pq.pop() == heapq.heappop(heap)
+    assert pq.pop() is None
+    assert pq.peek() is None
+
+
+@pytest.mark.parametrize("arity", [2, 4])
+def test_equal_keys_leave_in_push_order(arity):
+    pairs = [(index % 3, index) for index in range(60)]
+    pq = KeyedPQ(pairs, arity=arity)
+    for index in range(60, 90):
+        pq.push(index % 3, index)
+    popped = [pq.pop() for index in range(len(pq))]
+    assert popped == sorted(pairs + [(index % 3, index) for index in range(60, 90)])
+
+
+@pytest.mark.parametrize("arity", [2, 4])
+def test_decrease_key_of_bulk_loaded_items(arity):
+    rng = random.Random(7)
+    keys = [rng.randrange(10000) for index in range(500)]
+    pq, handles = KeyedPQ.from_items([(key, index) for index, key in enumerate(keys)],
+                                     arity=arity)
+    assert len(handles) == len(keys)
+    for index in rng.sample(range(len(keys)), 200):
+        assert pq.get_key(handles[index]) == keys[index]
+        keys[index] -= rng.randrange(20000)
+        pq.decrease_key(handles[index], keys[index])
+
+    popped = [pq.pop() for index in range(len(keys))]
+    assert [key for key, item in popped] == sorted(keys)
+    assert all(keys[item] == key for key, item in popped)
+
+
+def test_stale_handle_and_increased_key_raise():
+    pq = KeyedPQ()
+    first = pq.push(1, 'a')
+    second = pq.push(2, 'b')
+    with pytest.raises(ValueError):
+        pq.decrease_key(second, 3)
+    assert pq.pop() == (1, 'a')
+    with pytest.raises(ValueError):
+        pq.decrease_key(first, 0)
+    with pytest.raises(ValueError):
+        pq.get_key(first)
+    with pytest.raises(ValueError):
+        KeyedPQ([(5, 'c')]).get_key(second)
+    assert pq.get_key(second) == 2
@@ -0,0 +1,53 @@
+import pickle
+import sys
+import threading
+from collections import Counter
+
+from shardedMap import ShardedMap
+from sortedMap import SortedMap
+
+
+def test_concurrent_increments_and_merges_are_not_lost():
+    sharded_map = ShardedMap(num_shards=4)
+    words = ['w%d' % index for index in range(40)]
+
+    def count(thread_num):
+        for round_num in range(1000):
+            sharded_map.increment(words[(thread_num + round_num) % len(words)])
+            if round_num % 250 == 0:
+                sharded_map.merge(Counter(words))
+
+    switch_interval = sys.getswitchinterval()
+    # switch threads often, so unlocked updates would be lost
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=count, args=(thread_num,)) for thread_num in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert len(sharded_map) == len(words)
+    # 8 threads * 1000 increments, plus 8 threads * 4 merges of every word
+    assert sum(entry.value for entry in sharded_map) == 8 * 1000 + 8 * 4 * len(words)
+    assert sharded_map.get_value('w0') == 8 * 1000 // len(words) + 8 * 4
+
+
+def test_pickled_map_keeps_entries_and_shard_class():
+    sharded_map = ShardedMap(num_shards=3, shard_class=SortedMap)
+    sharded_map.merge([('a', 2), ('b', 3), ('a', 4)])
+    for number in range(100):
+        sharded_map.add('k%d' % number, number)
+    sharded_map.remove('k50')
+
+    copy = pickle.loads(pickle.dumps(sharded_map))
+    assert len(copy) == len(sharded_map) == 101
+    assert sorted(copy.items()) == sorted(sharded_map.items())
+    assert copy.get_value('a') == 6
+    assert 'k50' not in copy
+    assert copy.get_value('k7') == 7
+    assert all(isinstance(shard, SortedMap) for shard in copy._shards)
+    assert copy.increment('b') == 4
+    assert sharded_map.get_value('b') == 3
@@ -0,0 +1,51 @@
+import bisect
+import random
+
+import pytest
+
+from sortedMap import SortedMap
+
+
+def test_rank_and_select_after_removals():
+    rng = random.Random(5)
+    sorted_map = SortedMap(seed=7)
+    keys = rng.sample(range(10000), 2000)
+    for key in keys:
+        sorted_map.add(key, -key)
+    for key in keys[::3]:
+        assert sorted_map.remove(key).key == key
+    assert sorted_map.remove(keys[0]) is None
+
+    expected = sorted(set(keys) - set(keys[::3]))
+    assert len(sorted_map) == len(expected)
+    assert [entry.key for entry in sorted_map] == expected
+    for index in range(0, len(expected), 7):
+        assert sorted_map.select(index).key == expected[index]
+        assert sorted_map.rank(expected[index]) == index
+    assert sorted_map.select(-1).key == expected[-1]
+    for key in keys[::3][:100]:
+        assert sorted_map.rank(key) == bisect.bisect_left(expected, key)
+    with pytest.raises(IndexError):
+        sorted_map.select(len(expected))
+
+    assert sorted_map.get_min().key == expected[0]
+    assert sorted_map.get_max().key == expected[-1]
+    start, stop = bisect.bisect_left(expected, 2500), bisect.bisect_left(expected, 7500)
+    assert [entry.key for entry in sorted_map.range(2500, 7500)] == expected[start:stop]
+
+
+def test_floor_and_ceiling_after_removals():
+    sorted_map = SortedMap(seed=3)
+    for key in range(0, 1000, 10):
+        sorted_map.add(key, key)
+    for key in range(0, 1000, 20):
+        sorted_map.remove(key)
+
+    # the keys left are 10, 30, 50, ... 990
+    assert sorted_map.floor(5) is None
+    assert sorted_map.floor(30).key == 30
+    assert sorted_map.floor(49).key == 30
+    assert sorted_map.ceiling(31).key == 50
+    assert sorted_map.ceiling(990).key == 990
+    assert sorted_map.ceiling(991) is None
+    assert sorted_map.rank(40) == sorted_map.rank(50) == 2
@@ -18,15 +18,9 @@
 
 """
 
-from huffman import Huffman
+from huffman import Huffman, map_file
 from vigenere import Vigenere
 
-BITARRAY_EXISTS = True
-try:    
-    from bitarray import bitarray
-except:    
-    BITARRAY_EXISTS = False
-
 
 def main():
     """
@@ -39,6 +33,10 @@ def main():
     DECRYPT_COMPRESS_FILE = "FDREconomicsDecryptComp.txt"
     
     VIGENERE_KEY = "I love the USA!!"
+
+    # the encrypted file is only Huffman compressed when that
+    # saves at least this fraction of its size
+    MIN_SAVING = 0.2
     
     print("(1) Read in original file: Using " + INPUT_FILE)
     print("    Print the original file:")
@@ -82,20 +80,18 @@ def main():
     print()
 
     huff = Huffman()
-    binary_str = huff.compress(file_str)
+    compressed = huff.compress_to_bytes(file_str)
 
-    if BITARRAY_EXISTS: 
-        write_bin_file(COMPRESS_DAT_FILE, binary_str)     
+    write_bin_file(COMPRESS_DAT_FILE, compressed)
 
     print("(7) Read in compressed original file without encryption")
     print("    Decompress compressed file")
     print("    Print out decompressed file")
     print()
 
-    if BITARRAY_EXISTS: 
-        binary_str = read_bin_file(COMPRESS_DAT_FILE) 
-        
-    message = huff.decompress(binary_str)
+    huff = Huffman()
+    with read_bin_file(COMPRESS_DAT_FILE) as compressed:
+        message = huff.decompress_bytes(compressed)
     print(message)
     print()
 	
@@ -110,11 +106,14 @@ def main():
     print("    Compressed encrypted file: Using " + ENCRYPT_COMPRESS_DAT_FILE)
     print()
 
-    huff = Huffman()
-    binary_str = huff.compress(en_file_str)
+    huff = Huffman(min_saving=MIN_SAVING)
+    compressed = huff.compress_to_bytes(en_file_str)
+    if huff.stored:
+        print("    Compression would save less than {:.0%}:".format(MIN_SAVING))
+        print("    the encrypted file is stored without compression")
+        print()
 
-    if BITARRAY_EXISTS: 
-        write_bin_file(ENCRYPT_COMPRESS_DAT_FILE, binary_str)         
+    write_bin_file(ENCRYPT_COMPRESS_DAT_FILE, compressed)
 
         
     print("(10) Decompress compressed encrypted file")
@@ -122,10 +121,9 @@ def main():
     print("     Compressed encrypted file: Using " + ENCRYPT_COMPRESS_DAT_FILE)
     print()
     
-    if BITARRAY_EXISTS: 
-        binary_str = read_bin_file(ENCRYPT_COMPRESS_DAT_FILE)	
- 
-    message = huff.decompress(binary_str)
+    huff = Huffman()
+    with read_bin_file(ENCRYPT_COMPRESS_DAT_FILE) as compressed:
+        message = huff.decompress_bytes(compressed)
 
     print()
     print("(11) Decrypt decompressed file using key")
@@ -142,32 +140,21 @@ def main():
     open(DECRYPT_COMPRESS_FILE, 'w').write(file_str)	
 
 
-def write_bin_file(filename, binary_str):
+def write_bin_file(filename, compressed):
     """
     This function writes a compressed (binary) file to the disk 
     """
-    bits = bitarray(binary_str)
     out_file = open(filename, 'wb')
-    bits.tofile(out_file)
+    out_file.write(compressed)
     out_file.close()
 
 
 def read_bin_file(filename):        
     """
     This function reads a compressed (binary) file to the disk 
+    The file is memory mapped instead of read into memory, for
+    use in a with block, which closes the mapping
     """
-    bit_str = bitarray()
-    input_file = open(filename, 'rb')
-    bit_str.fromfile(input_file)
-    input_file.close()
-    
-    # Need to turn bitarray into a string of 1's and 0's
-    bin_str = ""
-    for b in bit_str:
-        if b:
-            bin_str += "1"
-        else:     
-            bin_str += "0"
-    return  bin_str
+    return map_file(filename)
 
 main()